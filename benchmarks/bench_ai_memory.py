@@ -0,0 +1,125 @@
+"""Бенчмарк памяти: пик RSS на один AI-ответ до и после потокового декодирования
+
+Ответ API (JSON с data URL PNG ~4 МБ base64) отдается через
+httpx.MockTransport кусками по 64 КБ, как из сети. Каждый режим
+запускается в отдельном процессе. Перед замером выполняется прогревочный
+запрос с маленькой картинкой, затем пик RSS процесса сбрасывается
+(/proc/self/clear_refs) - в прирост пика (VmHWM - VmRSS до запроса)
+попадает только обработка самого ответа.
+
+  legacy    - response.json() + split + b64decode + frombuffer + imdecode
+  streaming - ImagePayloadParser: base64 декодируется по кускам в один буфер
+
+Запуск из корня проекта (только Linux):
+    python -m benchmarks.bench_ai_memory
+"""
+
+import asyncio
+import base64
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import cv2
+import httpx
+import numpy as np
+
+from generator.ai_generator import AIImageGenerator
+
+CHUNK = 64 * 1024
+SIZE = 1024
+
+
+def _response_body(size: int) -> bytes:
+    # Шум почти не сжимается в PNG - размер близок к реальным ответам модели
+    rng = np.random.default_rng(0)
+    image = rng.integers(0, 256, (size, size, 3), dtype=np.uint8)
+    png = cv2.imencode('.png', image)[1].tobytes()
+    url = "data:image/png;base64," + base64.b64encode(png).decode('ascii')
+    return json.dumps({
+        "choices": [{"message": {"role": "assistant", "content": "",
+                                 "images": [{"type": "image_url", "image_url": {"url": url}}]}}],
+    }).encode('utf-8')
+
+
+def _transport(bodies: list) -> httpx.MockTransport:
+    def handler(request: httpx.Request) -> httpx.Response:
+        body = bodies.pop(0)
+
+        async def stream():
+            for start in range(0, len(body), CHUNK):
+                yield body[start:start + CHUNK]
+        return httpx.Response(200, headers={"content-length": str(len(body))}, content=stream())
+    return httpx.MockTransport(handler)
+
+
+async def _legacy(client: httpx.AsyncClient) -> np.ndarray:
+    response = await client.post("/chat/completions", json={})
+    data = response.json()
+    url = data['choices'][0]['message']['images'][0]['image_url']['url']
+    image_bytes = base64.b64decode(url.split(',', 1)[1])
+    return cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+async def _streaming(generator: AIImageGenerator) -> np.ndarray:
+    image, _ = await generator._generate("prompt")
+    return image
+
+
+def _memory_mb(field: str) -> float:
+    """Поле VmRSS/VmHWM из /proc/self/status в мегабайтах"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+    raise RuntimeError(f"{field} не найден в /proc/self/status")
+
+
+def _reset_peak() -> None:
+    # "5" сбрасывает VmHWM до текущего RSS
+    with open('/proc/self/clear_refs', 'w') as f:
+        f.write('5')
+
+
+def child(mode: str, body_path: str) -> None:
+    with open(body_path, 'rb') as f:
+        body = f.read()
+    generator = AIImageGenerator("bench")
+    generator._client = httpx.AsyncClient(base_url=generator.api_url,
+                                          transport=_transport([_response_body(16), body]))
+    run = (lambda: _legacy(generator._client)) if mode == "legacy" else (lambda: _streaming(generator))
+
+    async def measure() -> float:
+        await run()  # прогрев: event loop, httpx, cv2
+        _reset_peak()
+        baseline = _memory_mb('VmRSS')
+        image = await run()
+        assert image is not None and image.shape == (SIZE, SIZE, 3)
+        return _memory_mb('VmHWM') - baseline
+
+    print(f"{len(body) / 1024 / 1024:.1f} {asyncio.run(measure()):.1f}")
+
+
+def main() -> None:
+    frame_mb = SIZE * SIZE * 3 / 1024 / 1024
+    print(f"AI-ответ {SIZE}x{SIZE} PNG, декодированный кадр {frame_mb:.1f} МБ")
+    print(f"{'mode':<10} {'response, MB':>13} {'peak RSS +, MB':>15}")
+    with tempfile.TemporaryDirectory() as tmp:
+        body_path = os.path.join(tmp, "response.json")
+        with open(body_path, 'wb') as f:
+            f.write(_response_body(SIZE))
+        for mode in ("legacy", "streaming"):
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_ai_memory", mode, body_path],
+                check=True, capture_output=True, text=True,
+            ).stdout.split()
+            print(f"{mode:<10} {float(output[0]):13.1f} {float(output[1]):15.1f}")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        child(sys.argv[1], sys.argv[2])
+    else:
+        main()
@@ -0,0 +1,71 @@
+"""Бенчмарк памяти рендера: сколько полнокадровых буферов создает каждый стиль
+
+Считаются:
+  - PIL images - число изображений, созданных внутри PIL (Image.core.get_stats)
+  - numpy peak - пик памяти NumPy-массивов (tracemalloc) в полных кадрах 1280x640x3
+
+Текст рисуется на холсте на месте, но каждый вызов draw.text создает
+маленькую маску глифов, которая тоже попадает в счетчик PIL. Поэтому
+стили замеряются с пустым заголовком - остаются только буферы кадра.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_allocations
+"""
+
+import tracemalloc
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from generator.image_generator import ImageGenerator
+from generator.templates import TemplateConfig
+
+FRAME_BYTES = TemplateConfig.WIDTH * TemplateConfig.HEIGHT * 3
+# Пустой текст - в счетчик PIL не попадают маски глифов (см. docstring модуля)
+TITLE = ""
+DESCRIPTION = None
+
+
+def _ai_like_image() -> np.ndarray:
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 256, (32, 32, 3), dtype=np.uint8)
+    return cv2.resize(small, (1024, 1024), interpolation=cv2.INTER_CUBIC)
+
+
+def measure(func) -> tuple:
+    """(PIL images, numpy peak в кадрах) для одного вызова func"""
+    func()  # прогрев: шрифты, кэши раскладки
+    pil_before = Image.core.get_stats()["new_count"]
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    pil_images = Image.core.get_stats()["new_count"] - pil_before
+    return pil_images, peak / FRAME_BYTES
+
+
+def main() -> None:
+    generator = ImageGenerator()
+    ai_image = _ai_like_image()
+    background = cv2.resize(ai_image, (1600, 900))
+
+    cases = {
+        "minimal": lambda: generator.generate_minimal(TITLE, DESCRIPTION),
+        "gradient": lambda: generator.generate_gradient(TITLE, DESCRIPTION, "ocean"),
+        "gradient (aurora)": lambda: generator.generate_gradient(TITLE, DESCRIPTION, "aurora"),
+        "ai_only": lambda: generator.generate_ai_only(ai_image),
+        "custom + text": lambda: generator.generate_with_background(
+            TITLE, DESCRIPTION, background_image=background),
+        "custom, no text": lambda: generator.generate_with_background(
+            TITLE, DESCRIPTION, background_image=background, add_text=False),
+    }
+
+    print(f"{'style':<20} {'PIL images':>10} {'numpy peak, frames':>20}")
+    for name, func in cases.items():
+        pil_images, frames = measure(func)
+        print(f"{name:<20} {pil_images:>10} {frames:>20.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Бенчмарк кодирования: время против размера для PNG / JPEG / WebP
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_encode
+"""
+
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from generator.encoder import ImageEncoder
+from generator.image_generator import ImageGenerator
+from generator.templates import TemplateConfig
+
+ENCODERS = {
+    "PNG level 1": ImageEncoder("PNG", png_compress_level=1),
+    "PNG level 6 (default)": ImageEncoder("PNG", png_compress_level=6),
+    "PNG level 9": ImageEncoder("PNG", png_compress_level=9),
+    "JPEG q85": ImageEncoder("JPEG", quality=85),
+    "JPEG q95": ImageEncoder("JPEG", quality=95),
+    "WEBP q80": ImageEncoder("WEBP", quality=80),
+    "WEBP q95": ImageEncoder("WEBP", quality=95),
+}
+
+
+def photo_like_image() -> Image.Image:
+    """Синтетическое "фото": сглаженный шум с мелкой текстурой, как у AI-иллюстрации"""
+    rng = np.random.default_rng(42)
+    small = rng.integers(0, 256, (40, 80, 3), dtype=np.uint8)
+    img = cv2.resize(small, (TemplateConfig.WIDTH, TemplateConfig.HEIGHT), interpolation=cv2.INTER_CUBIC)
+    noise = rng.normal(0, 8, img.shape)
+    img = np.clip(img + noise, 0, 255).astype(np.uint8)
+    return Image.fromarray(img)
+
+
+def flat_image() -> Image.Image:
+    """Градиентный фон"""
+    return ImageGenerator()._create_gradient_canvas("ocean")
+
+
+def _measure(encoder: ImageEncoder, img: Image.Image, repeat: int = 5) -> tuple:
+    best = float('inf')
+    size = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        size = len(encoder.encode(img).getvalue())
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, size / 1024
+
+
+def main() -> None:
+    for name, img in (("AI-like photo", photo_like_image()), ("gradient", flat_image())):
+        print(f"\n{name} {img.width}x{img.height}")
+        print(f"{'encoder':<24} {'time, ms':>10} {'size, KB':>10}")
+        for enc_name, encoder in ENCODERS.items():
+            ms, kb = _measure(encoder, img)
+            print(f"{enc_name:<24} {ms:10.1f} {kb:10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Бенчмарк: задержка event loop во время тяжелого рендера
+
+Пока идут рендеры с большим пользовательским фоном, отдельная задача
+"тикает" каждые 5 мс и замеряет, насколько позже она просыпается.
+Это задержка, которую увидят обновления всех остальных пользователей.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_event_loop
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from bot.render_pool import RenderPool
+from generator import jobs
+from generator.image_generator import ImageGenerator
+
+TICK = 0.005
+RENDERS = 6
+TITLE = "Тяжелый рендер с большим фоном"
+DESCRIPTION = "Фон 6000x4000 декодируется, масштабируется и кодируется в PNG"
+
+
+async def _ticker(lags: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - start - TICK)
+
+
+async def _run(render) -> tuple:
+    lags: list = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(lags, stop))
+    # Даем тикеру заснуть до начала рендера
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await render()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker
+    lags.sort()
+    p99 = lags[int(len(lags) * 0.99)] if lags else 0.0
+    return elapsed, max(lags, default=0.0), p99
+
+
+def main() -> None:
+    generator = ImageGenerator()
+    generator.prewarm_fonts()
+
+    rng = np.random.default_rng(0)
+    background = cv2.resize(rng.integers(0, 256, (40, 60, 3), dtype=np.uint8), (6000, 4000))
+    with tempfile.TemporaryDirectory() as tmp:
+        bg_path = os.path.join(tmp, "bg.jpg")
+        cv2.imwrite(bg_path, background)
+
+        async def inline() -> None:
+            # Старое поведение: рендер прямо в обработчике
+            for _ in range(RENDERS):
+                jobs.render('custom', TITLE, DESCRIPTION, background_path=bg_path)
+
+        def pooled(pool: RenderPool):
+            async def render() -> None:
+                await asyncio.gather(*[
+                    pool.run(jobs.render, 'custom', TITLE, DESCRIPTION, background_path=bg_path)
+                    for _ in range(RENDERS)
+                ])
+            return render
+
+        jobs.set_generator(generator)
+        thread_pool = RenderPool(generator, "thread", 2)
+        process_pool = RenderPool(generator, "process", 2)
+        # Прогрев процессов (запуск + шрифты)
+        asyncio.run(process_pool.run(jobs.render, 'minimal', 'warmup'))
+
+        print(f"{RENDERS} рендеров с фоном 6000x4000")
+        print(f"{'mode':<16} {'total, s':>9} {'max lag, ms':>12} {'p99 lag, ms':>12}")
+        for name, render in (("inline", inline), ("thread pool", pooled(thread_pool)),
+                             ("process pool", pooled(process_pool))):
+            elapsed, max_lag, p99 = asyncio.run(_run(render))
+            print(f"{name:<16} {elapsed:9.2f} {max_lag * 1000:12.1f} {p99 * 1000:12.1f}")
+
+        thread_pool.shutdown()
+        process_pool.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""Бенчмарк: векторизованный градиент против старого построчного цикла
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_gradient
+"""
+
+import timeit
+
+import numpy as np
+
+from generator.gradients import (
+    DIAGONAL,
+    RADIAL,
+    VERTICAL,
+    create_gradient,
+    create_linear_gradient,
+)
+from generator.templates import TemplateConfig, get_gradient_spec
+
+WIDTH = TemplateConfig.WIDTH
+HEIGHT = TemplateConfig.HEIGHT
+START = (34, 193, 195)
+END = (45, 134, 253)
+
+
+def legacy_gradient(start_color, end_color) -> np.ndarray:
+    """Старая реализация ImageGenerator._create_gradient (для сравнения)"""
+    img = np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8)
+    for y in range(HEIGHT):
+        ratio = y / HEIGHT
+        b = int(start_color[0] * (1 - ratio) + end_color[0] * ratio)
+        g = int(start_color[1] * (1 - ratio) + end_color[1] * ratio)
+        r = int(start_color[2] * (1 - ratio) + end_color[2] * ratio)
+        img[y, :] = [b, g, r]
+    return img
+
+
+def _best_ms(func, number: int = 20, repeat: int = 5) -> float:
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1000
+
+
+def main() -> None:
+    # Результат должен совпадать со старым циклом (допускаем ±1 из-за округления float)
+    diff = np.abs(
+        legacy_gradient(START, END).astype(np.int16)
+        - create_linear_gradient(WIDTH, HEIGHT, START, END).astype(np.int16)
+    )
+    print(f"Макс. расхождение со старым циклом: {int(diff.max())}")
+
+    legacy_ms = _best_ms(lambda: legacy_gradient(START, END))
+    print(f"{'legacy loop (vertical)':<28} {legacy_ms:8.3f} ms")
+
+    cases = {
+        "vertical": lambda: create_linear_gradient(WIDTH, HEIGHT, START, END, VERTICAL),
+        "diagonal": lambda: create_linear_gradient(WIDTH, HEIGHT, START, END, DIAGONAL),
+        "radial": lambda: create_linear_gradient(WIDTH, HEIGHT, START, END, RADIAL),
+        "multi-stop (aurora)": lambda: create_gradient(WIDTH, HEIGHT, *reversed(get_gradient_spec("aurora"))),
+    }
+    for name, func in cases.items():
+        ms = _best_ms(func)
+        print(f"{name:<28} {ms:8.3f} ms  (x{legacy_ms / ms:.1f} быстрее цикла)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Бенчмарк: подсказка стиля мема - скомпилированная регулярка против цепочки any(...)
+
+Сначала проверяется, что результат совпадает со старой реализацией на
+всех текстах корпуса (в том числе с перекрывающимися словами разных
+категорий), затем замеряется время на текст. На текущих ~35 словах
+цепочка any(...) сравнима по скорости (поиск подстроки в C очень быстрый),
+но ее время растет с числом слов, а один проход регулярки - почти нет:
+это видно на синтетических наборах правил из сотен и тысяч слов.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_meme_hints
+"""
+
+import itertools
+import random
+import timeit
+
+from generator.meme_hints import Category, MemeHintClassifier, load_classifier
+
+TEXTS = [
+    "Итоги недели",
+    "Как мы вдвое сократили задержку рендера",
+    "Провал релиза: почему упала прод-база",
+    "Неожиданно: рост продаж в кризис",
+    "Совещание, которое могло быть письмом",
+    "Что нового в Python 3.13 - узнал много интересного",
+    "WOW! Клиент заплатил вперед",
+    "Подробный разбор профилирования, векторизации градиентов, кэширования метрик "
+    "шрифтов и кодирования прямо из буфера холста без промежуточных копий " * 3,
+]
+
+
+def legacy_hint(title: str, description: str = None) -> str:
+    """Старая реализация AIImageGenerator._get_meme_context_hint (для сравнения)"""
+    text = (title + " " + (description or "")).lower()
+
+    if any(word in text for word in ["не получается", "провал", "ошибка", "упала", "падает", "кризис"]):
+        return "Suggested meme style: Disappointed/frustrated reaction. Think: facepalm, head in hands, 'why me' expression."
+
+    elif any(word in text for word in ["успех", "получилось", "победа", "рост", "выиграл"]):
+        return "Suggested meme style: Victory/celebration reaction. Think: triumphant pose, happy dance, 'yes!' moment."
+
+    elif any(word in text for word in ["удивительно", "неожиданно", "шок", "wow", "офигеть"]):
+        return "Suggested meme style: Shocked/surprised reaction. Think: wide eyes, dropped jaw, pointing at something."
+
+    elif any(word in text for word in ["думаю", "размышление", "вопрос", "как", "почему"]):
+        return "Suggested meme style: Thinking/confused reaction. Think: scratching head, looking puzzled, contemplating."
+
+    elif any(word in text for word in ["работа", "офис", "начальник", "коллеги", "совещание"]):
+        return "Suggested meme style: Office/work situation. Think: office worker's relatable moment, meeting scene, desk drama."
+
+    elif any(word in text for word in ["деньги", "продаж", "клиент", "бизнес", "прибыль"]):
+        return "Suggested meme style: Money/business related. Think: counting money, empty wallet, negotiation scene."
+
+    elif any(word in text for word in ["учимся", "обучение", "новое", "не знал", "узнал"]):
+        return "Suggested meme style: Learning/discovery moment. Think: 'aha!' moment, mind blown, taking notes intensely."
+
+    else:
+        return "Suggested meme style: Universal relatable reaction. Make it expressive and dramatic."
+
+
+def corpus(classifier, size: int = 5000) -> list:
+    """Случайные тексты из слов правил, их склеек и обычных слов"""
+    rng = random.Random(0)
+    words = [word for category in classifier.categories for word in category.keywords]
+    filler = ["пост", "канал", "неделя", "релиз", "данные", "и", "в", "на", "не", "по"]
+    texts = list(TEXTS)
+    for _ in range(size):
+        parts = rng.choices(filler, k=rng.randint(0, 12))
+        for _ in range(rng.randint(0, 3)):
+            word = rng.choice(words)
+            # Склейка с соседним словом - проверка перекрытий и вхождений внутри слов
+            parts.insert(rng.randint(0, len(parts)), word + rng.choice(["", rng.choice(words)]))
+        text = " ".join(parts)
+        texts.append(text.upper() if rng.random() < 0.1 else text)
+    return texts
+
+
+def chain_hint(classifier, text: str) -> str:
+    """Цепочка any(...) по произвольным правилам (как старая реализация)"""
+    text = text.lower()
+    for category in classifier.categories:
+        if any(word in text for word in category.keywords):
+            return category.hint
+    return classifier.default
+
+
+def synthetic_rules(categories: int, keywords: int) -> MemeHintClassifier:
+    """Набор случайных правил заданного размера"""
+    rng = random.Random(categories * keywords)
+    alphabet = "абвгдежзийклмнопрстуфхцчшщыьэюя"
+    return MemeHintClassifier([
+        Category(f"c{index}",
+                 tuple("".join(rng.choices(alphabet, k=rng.randint(4, 9))) for _ in range(keywords)),
+                 f"hint {index}")
+        for index in range(categories)
+    ], "default")
+
+
+def _best_us(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> None:
+    classifier = load_classifier()
+    texts = corpus(classifier)
+
+    mismatches = [text for text in texts if classifier.hint(text + " ") != legacy_hint(text)]
+    print(f"Текстов: {len(texts)}, расхождений со старой реализацией: {len(mismatches)}")
+    for text in mismatches[:5]:
+        print(f"  {text!r}")
+
+    for name, sample in (("short", TEXTS[:7]), ("long", TEXTS[7:]), ("corpus", texts[:1000])):
+        cycle = itertools.cycle(sample)
+        legacy_us = _best_us(lambda: legacy_hint(next(cycle)), 2000)
+        compiled_us = _best_us(lambda: classifier.hint(next(cycle)), 2000)
+        print(f"{name:<8} legacy {legacy_us:8.2f} us   compiled {compiled_us:8.2f} us   "
+              f"x{legacy_us / compiled_us:.2f}")
+
+    print("\nСинтетические правила (категорий x слов):")
+    for categories, keywords in ((20, 20), (50, 40)):
+        rules = synthetic_rules(categories, keywords)
+        mismatches = sum(rules.hint(text) != chain_hint(rules, text) for text in texts[:1000])
+        for name, text in (("short", TEXTS[1]), ("long", TEXTS[7])):
+            chain_us = _best_us(lambda: chain_hint(rules, text), 500)
+            compiled_us = _best_us(lambda: rules.hint(text), 500)
+            print(f"{categories:>3} x {keywords:<3} {name:<6} any-chain {chain_us:8.2f} us   "
+                  f"compiled {compiled_us:8.2f} us   x{chain_us / compiled_us:.2f}   "
+                  f"расхождений: {mismatches}")
+
+
+if __name__ == '__main__':
+    main()
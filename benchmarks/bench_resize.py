@@ -0,0 +1,109 @@
+"""Бенчмарк масштабирования под холст 1280x640: скорость и качество
+
+  legacy - полное декодирование, LANCZOS4 всего изображения, затем crop
+  fast   - decode с IMREAD_REDUCED_* (если источник намного больше холста),
+           crop ROI до ресемплинга, INTER_AREA при уменьшении
+
+Качество - PSNR относительно эталона: полное декодирование и INTER_AREA
+той же области без уменьшения в декодере (dB, больше - ближе; выше ~40 dB
+разница на глаз не видна). Legacy при сильном уменьшении дает алиасинг,
+поэтому его PSNR тоже ниже бесконечности. Если источник меньше холста
+(увеличение), эталон совпадает с fast - в таблице "exact".
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_resize
+"""
+
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from generator.resize import cover_roi, read_cover, resize_cover
+from generator.templates import TemplateConfig
+
+WIDTH = TemplateConfig.WIDTH
+HEIGHT = TemplateConfig.HEIGHT
+REPEATS = 10
+
+# (название, ширина, высота)
+SOURCES = (
+    ("AI 1024x1024", 1024, 1024),
+    ("AI 2048x2048", 2048, 2048),
+    ("photo 4000x3000", 4000, 3000),
+    ("photo 6000x4000", 6000, 4000),
+)
+
+
+def _source(width: int, height: int) -> np.ndarray:
+    """Похожее на фото изображение: плавные цвета + контрастные детали"""
+    rng = np.random.default_rng(0)
+    image = cv2.resize(rng.integers(0, 256, (24, 32, 3), dtype=np.uint8), (width, height),
+                       interpolation=cv2.INTER_CUBIC)
+    for _ in range(60):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        cv2.circle(image, center, int(rng.integers(5, width // 8)), color, max(1, width // 500))
+    return image
+
+
+def legacy(path: str) -> np.ndarray:
+    image = cv2.imread(path)
+    src_height, src_width = image.shape[:2]
+    scale = max(WIDTH / src_width, HEIGHT / src_height)
+    new_width = max(WIDTH, int(src_width * scale))
+    new_height = max(HEIGHT, int(src_height * scale))
+    resized = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
+    x = (new_width - WIDTH) // 2
+    y = (new_height - HEIGHT) // 2
+    return resized[y:y + HEIGHT, x:x + WIDTH]
+
+
+def reference(path: str) -> np.ndarray:
+    image = cv2.imread(path)
+    src_height, src_width = image.shape[:2]
+    if src_width < WIDTH or src_height < HEIGHT:
+        return resize_cover(image, WIDTH, HEIGHT)
+    x, y, roi_width, roi_height = cover_roi(src_width, src_height, WIDTH, HEIGHT)
+    return cv2.resize(image[y:y + roi_height, x:x + roi_width], (WIDTH, HEIGHT),
+                      interpolation=cv2.INTER_AREA)
+
+
+def fast(path: str) -> np.ndarray:
+    return resize_cover(read_cover(path, WIDTH, HEIGHT), WIDTH, HEIGHT)
+
+
+def _psnr(ideal: np.ndarray, result: np.ndarray) -> str:
+    psnr = cv2.PSNR(ideal, result)
+    # Для одинаковых изображений cv2.PSNR возвращает ~361
+    return "exact" if psnr > 100 else f"{psnr:.1f}"
+
+
+def _timeit(func, path: str) -> tuple:
+    result = func(path)
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        func(path)
+    return (time.perf_counter() - start) / REPEATS * 1000, result
+
+
+def main() -> None:
+    print(f"Холст {WIDTH}x{HEIGHT}, источник - JPEG q95, среднее из {REPEATS}")
+    print(f"{'source':<18} {'legacy, ms':>11} {'fast, ms':>9} {'speedup':>8} "
+          f"{'PSNR legacy':>12} {'PSNR fast':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, width, height in SOURCES:
+            path = os.path.join(tmp, f"{width}x{height}.jpg")
+            cv2.imwrite(path, _source(width, height), [cv2.IMWRITE_JPEG_QUALITY, 95])
+
+            ideal = reference(path)
+            legacy_ms, legacy_result = _timeit(legacy, path)
+            fast_ms, fast_result = _timeit(fast, path)
+            print(f"{name:<18} {legacy_ms:11.1f} {fast_ms:9.1f} {legacy_ms / fast_ms:7.1f}x "
+                  f"{_psnr(ideal, legacy_result):>12} {_psnr(ideal, fast_result):>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+"""Набор бенчмарков горячих путей генерации с сохранением и сравнением результатов
+
+Замеряется время (медиана, p90, минимум по серии запусков) и пик памяти
+Python/NumPy-аллокаций (tracemalloc, отдельным запуском) для:
+  - _create_gradient и холстов градиентных пресетов
+  - _wrap_text (прогретый и холодный кэш ширин слов)
+  - каждого стиля generate_*
+  - кодирования PNG
+  - масштабирования AI-изображения под холст
+на коротких/длинных латинских и кириллических текстах. Входные данные
+детерминированы (фиксированные seed), перед замером - прогрев.
+
+Запуск из корня проекта:
+    python -m benchmarks.suite run                         # -> benchmarks/results/latest.json
+    python -m benchmarks.suite run --save-baseline         # то же + baseline.json
+    python -m benchmarks.suite run --compare               # запуск и сравнение с baseline
+    python -m benchmarks.suite compare old.json new.json   # сравнение двух файлов
+
+При сравнении регрессией считается рост медианы времени больше чем на
+--threshold (по умолчанию 15%) или пика памяти больше чем на
+--memory-threshold (10%); код возврата 1, если регрессии есть.
+Сравнивать имеет смысл результаты с одной машины.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Optional
+
+import cv2
+import numpy as np
+import PIL
+
+from generator.image_generator import ImageGenerator
+from generator.layout import TextLayout
+from generator.resize import resize_cover
+from generator.templates import TemplateConfig
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+LATEST_PATH = os.path.join(RESULTS_DIR, "latest.json")
+BASELINE_PATH = os.path.join(RESULTS_DIR, "baseline.json")
+
+# Минимальная длительность серии и границы числа запусков на кейс
+MIN_SECONDS = 0.5
+MIN_RUNS = 5
+MAX_RUNS = 200
+
+TEXTS = {
+    "latin-short": ("Weekly digest", "Five links worth reading"),
+    "latin-long": (
+        "How we cut rendering latency in half by removing allocations from the hot path",
+        "A detailed walkthrough of profiling, vectorizing gradients, caching font metrics "
+        "and encoding directly from the canvas buffer without intermediate copies " * 2,
+    ),
+    "cyrillic-short": ("Итоги недели", "Пять ссылок для чтения"),
+    "cyrillic-long": (
+        "Как мы вдвое сократили задержку рендера, убрав лишние аллокации из горячего пути",
+        "Подробный разбор профилирования, векторизации градиентов, кэширования метрик "
+        "шрифтов и кодирования прямо из буфера холста без промежуточных копий " * 2,
+    ),
+}
+
+
+def _ai_image(size: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 256, (32, 32, 3), dtype=np.uint8)
+    return cv2.resize(small, (size, size), interpolation=cv2.INTER_CUBIC)
+
+
+def build_cases(generator: ImageGenerator) -> dict[str, Callable[[], object]]:
+    """Кейсы бенчмарка: имя -> функция без аргументов"""
+    width = generator.width - TemplateConfig.PADDING * 2
+    title_font = generator._get_font(TemplateConfig.TITLE_FONT_SIZE, bold=True)
+    ai_image = _ai_image(1024)
+    background = _ai_image(2048)
+    canvas = generator._create_gradient_canvas("ocean")
+
+    cases: dict[str, Callable[[], object]] = {
+        "gradient/_create_gradient": lambda: generator._create_gradient((34, 193, 195), (45, 134, 253)),
+        "gradient/canvas-aurora": lambda: generator._create_gradient_canvas("aurora"),
+        "gradient/canvas-glow": lambda: generator._create_gradient_canvas("glow"),
+        "encode/png": lambda: generator.encoder.encode(canvas, style="gradient"),
+        "resize/ai-1024": lambda: resize_cover(ai_image, generator.width, generator.height),
+        "resize/ai-2048": lambda: resize_cover(background, generator.width, generator.height),
+        "generate/ai_only-1024": lambda: generator.generate_ai_only(ai_image),
+    }
+    for text_name, (title, description) in TEXTS.items():
+        cases[f"wrap/{text_name}"] = (
+            lambda t=title, d=description: (generator._wrap_text(t, title_font, width),
+                                            generator._wrap_text(d, title_font, width)))
+        cases[f"wrap-cold/{text_name}"] = (
+            lambda t=title, d=description: TextLayout().wrap(t + " " + d, title_font, width))
+        cases[f"generate/minimal/{text_name}"] = (
+            lambda t=title, d=description: generator.generate_minimal(t, d))
+        cases[f"generate/gradient/{text_name}"] = (
+            lambda t=title, d=description: generator.generate_gradient(t, d, "ocean"))
+        cases[f"generate/custom/{text_name}"] = (
+            lambda t=title, d=description: generator.generate_with_background(
+                t, d, background_image=background))
+    return cases
+
+
+def time_case(func: Callable[[], object]) -> dict:
+    """Серия запусков: не меньше MIN_RUNS и MIN_SECONDS, не больше MAX_RUNS"""
+    func()  # прогрев
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < MAX_RUNS and (len(samples) < MIN_RUNS
+                                       or time.perf_counter() - started < MIN_SECONDS):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "runs": len(samples),
+        "median_ms": statistics.median(samples),
+        "p90_ms": samples[min(len(samples) - 1, int(len(samples) * 0.9))],
+        "min_ms": samples[0],
+    }
+
+
+def memory_case(func: Callable[[], object]) -> int:
+    """Пик памяти Python/NumPy-аллокаций (байт) за один вызов"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "pillow": PIL.__version__,
+    }
+
+
+def run_suite(name_filter: Optional[str] = None) -> dict:
+    generator = ImageGenerator()
+    generator.prewarm_fonts()
+    results = {}
+    for name, func in build_cases(generator).items():
+        if name_filter and name_filter not in name:
+            continue
+        result = time_case(func)
+        result["peak_kb"] = memory_case(func) / 1024
+        results[name] = result
+        print(f"{name:<40} {result['median_ms']:9.2f} ms  p90 {result['p90_ms']:9.2f} ms  "
+              f"peak {result['peak_kb']:9.0f} KB", file=sys.stderr)
+    return {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "environment": environment(),
+            "results": results}
+
+
+def compare(baseline: dict, current: dict, threshold: float, memory_threshold: float) -> list:
+    """Вывести таблицу сравнения; вернуть список регрессий"""
+    regressions = []
+    print(f"{'case':<40} {'base, ms':>9} {'now, ms':>9} {'time':>8} {'memory':>8}")
+    for name, now in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            print(f"{name:<40} {'-':>9} {now['median_ms']:9.2f}      new")
+            continue
+        time_ratio = now["median_ms"] / base["median_ms"] if base["median_ms"] else 1.0
+        memory_ratio = now["peak_kb"] / base["peak_kb"] if base["peak_kb"] else 1.0
+        flags = []
+        if time_ratio > 1 + threshold:
+            flags.append("TIME")
+        if memory_ratio > 1 + memory_threshold:
+            flags.append("MEMORY")
+        if flags:
+            regressions.append((name, flags))
+        print(f"{name:<40} {base['median_ms']:9.2f} {now['median_ms']:9.2f} "
+              f"{time_ratio - 1:+7.0%} {memory_ratio - 1:+7.0%}  {' '.join(flags)}")
+
+    if baseline.get("environment") != current.get("environment"):
+        print("\n[WARNING] Окружение отличается от baseline - сравнение может быть неточным")
+    return regressions
+
+
+def _load(path: str) -> dict:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _save(data: dict, path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite",
+                                     description="Бенчмарки горячих путей генерации")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="запустить бенчмарки")
+    run_parser.add_argument("-o", "--output", default=LATEST_PATH, help="файл результатов (JSON)")
+    run_parser.add_argument("-k", "--filter", help="только кейсы, содержащие подстроку")
+    run_parser.add_argument("--save-baseline", action="store_true",
+                            help="сохранить результат как baseline")
+    run_parser.add_argument("--compare", action="store_true", help="сравнить с baseline")
+
+    compare_parser = commands.add_parser("compare", help="сравнить два файла результатов")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+
+    for sub in (run_parser, compare_parser):
+        sub.add_argument("--threshold", type=float, default=0.15,
+                         help="допустимый рост медианы времени (доля)")
+        sub.add_argument("--memory-threshold", type=float, default=0.10,
+                         help="допустимый рост пика памяти (доля)")
+        sub.add_argument("--baseline-path", default=BASELINE_PATH, help=argparse.SUPPRESS)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        current = run_suite(args.filter)
+        _save(current, args.output)
+        print(f"Результаты: {args.output}", file=sys.stderr)
+        if args.save_baseline:
+            _save(current, args.baseline_path)
+            print(f"Baseline: {args.baseline_path}", file=sys.stderr)
+        if not args.compare:
+            return 0
+        if not os.path.exists(args.baseline_path):
+            print(f"Baseline не найден: {args.baseline_path}", file=sys.stderr)
+            return 2
+        baseline = _load(args.baseline_path)
+    else:
+        baseline = _load(args.baseline)
+        current = _load(args.current)
+
+    regressions = compare(baseline, current, args.threshold, args.memory_threshold)
+    if regressions:
+        print(f"\nРегрессий: {len(regressions)}")
+        return 1
+    print("\nРегрессий нет")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,203 @@
+"""Фоновая очередь AI-генераций с честной очередностью между пользователями"""
+
+import asyncio
+import itertools
+import logging
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Optional
+
+from telegram import Bot
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Очередь переполнена (общий лимит или лимит пользователя)"""
+
+    def __init__(self, message: str, per_user: bool = False):
+        super().__init__(message)
+        self.per_user = per_user
+
+
+class AIJob:
+    """Задача AI-генерации одного превью"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, bot: Bot, user_id: int, chat_id: int, status_message_id: int,
+                 title: str, description: Optional[str] = None,
+                 speculative: Optional[asyncio.Task] = None):
+        self.id = next(self._ids)
+        self.bot = bot
+        self.user_id = user_id
+        self.chat_id = chat_id
+        self.status_message_id = status_message_id
+        self.title = title
+        self.description = description
+        # Упреждающий запрос по заголовку, результат которого использует задача
+        self.speculative = speculative
+        self.created = time.monotonic()
+        self.started: Optional[float] = None
+        # Подпись статусного сообщения меняют отправка задачи, цикл прогресса и
+        # воркер: правки идут по очереди, а результат не перезаписывается прогрессом
+        self.caption_lock = asyncio.Lock()
+        self.finished = False
+
+    @property
+    def elapsed(self) -> float:
+        """Секунд с момента постановки в очередь"""
+        return time.monotonic() - self.created
+
+
+class AIJobQueue:
+    """
+    Ограниченная очередь AI-задач
+
+    - Общий лимит ожидающих задач и лимит на пользователя (ожидающие +
+      выполняющиеся): при превышении submit бросает QueueFullError.
+    - Воркеры берут задачи по кругу между пользователями (round-robin),
+      поэтому один пользователь с несколькими задачами не задерживает
+      остальных.
+    - Раз в progress_interval секунд для каждой задачи вызывается
+      notify(job, position): position - место в очереди (1 - следующая),
+      0 - задача уже выполняется.
+    - Упреждающий AI-запрос занимает бронь (reserve) в тех же лимитах,
+      пока идет запрос к API; задача пользователя забирает его бронь.
+    """
+
+    def __init__(self, runner: Callable[[AIJob], Awaitable[None]],
+                 notify: Optional[Callable[[AIJob, int], Awaitable[None]]] = None,
+                 workers: int = 2, max_pending: int = 20, max_per_user: int = 1,
+                 progress_interval: float = 5.0):
+        self.runner = runner
+        self.notify = notify
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_per_user = max_per_user
+        self.progress_interval = progress_interval
+
+        # user_id -> задачи пользователя; порядок ключей - очередность обхода
+        self._pending: "OrderedDict[int, deque[AIJob]]" = OrderedDict()
+        self._pending_count = 0
+        self._running: dict[int, AIJob] = {}
+        # user_id -> владелец брони (упреждающий запрос)
+        self._reserved: dict[int, object] = {}
+        self._wakeup = asyncio.Condition()
+        self._tasks: list[asyncio.Task] = []
+
+    def _user_jobs(self, user_id: int) -> int:
+        pending = len(self._pending.get(user_id, ()))
+        running = sum(1 for job in self._running.values() if job.user_id == user_id)
+        return pending + running + int(user_id in self._reserved)
+
+    def _order(self) -> list[AIJob]:
+        """Порядок, в котором воркеры возьмут ожидающие задачи"""
+        queues = [list(jobs) for jobs in self._pending.values()]
+        order = []
+        for round_jobs in itertools.zip_longest(*queues):
+            order.extend(job for job in round_jobs if job is not None)
+        return order
+
+    def position(self, job: AIJob) -> int:
+        """Место задачи в очереди (1 - следующая), 0 - выполняется или не найдена"""
+        for index, queued in enumerate(self._order(), start=1):
+            if queued is job:
+                return index
+        return 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending_count
+
+    @property
+    def running(self) -> int:
+        return len(self._running)
+
+    @property
+    def reserved(self) -> int:
+        return len(self._reserved)
+
+    def check(self, user_id: int) -> None:
+        """Бросить QueueFullError, если задачу пользователя сейчас не принять"""
+        # Бронь пользователя переходит к его задаче и не мешает ей
+        own = int(user_id in self._reserved)
+        if self._user_jobs(user_id) - own >= self.max_per_user:
+            raise QueueFullError("Превышен лимит задач пользователя", per_user=True)
+        if self._pending_count + len(self._reserved) - own >= self.max_pending:
+            raise QueueFullError("Очередь AI-генераций переполнена")
+
+    def reserve(self, user_id: int, owner: object) -> None:
+        """Занять место пользователя в лимитах очереди (QueueFullError - мест нет)"""
+        self.check(user_id)
+        self._reserved[user_id] = owner
+
+    def release(self, user_id: int, owner: object) -> None:
+        """Освободить бронь, если она еще принадлежит owner"""
+        if self._reserved.get(user_id) is owner:
+            del self._reserved[user_id]
+
+    async def submit(self, job: AIJob) -> int:
+        """Поставить задачу в очередь; возвращает позицию"""
+        self.check(job.user_id)
+        self._reserved.pop(job.user_id, None)
+
+        self._pending.setdefault(job.user_id, deque()).append(job)
+        self._pending_count += 1
+        async with self._wakeup:
+            self._wakeup.notify()
+        return self.position(job)
+
+    def _take(self) -> AIJob:
+        """Следующая задача по кругу между пользователями"""
+        user_id, jobs = next(iter(self._pending.items()))
+        job = jobs.popleft()
+        del self._pending[user_id]
+        if jobs:
+            # Пользователь уходит в конец круга
+            self._pending[user_id] = jobs
+        self._pending_count -= 1
+        return job
+
+    async def _worker(self) -> None:
+        while True:
+            async with self._wakeup:
+                await self._wakeup.wait_for(lambda: self._pending_count > 0)
+                job = self._take()
+
+            job.started = time.monotonic()
+            self._running[job.id] = job
+            try:
+                await self.runner(job)
+            except Exception:
+                logger.exception("AI-задача %s завершилась с ошибкой", job.id)
+            finally:
+                self._running.pop(job.id, None)
+
+    async def _progress(self) -> None:
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            if self.notify is None:
+                continue
+            updates = [(job, 0) for job in self._running.values()]
+            updates += [(job, index) for index, job in enumerate(self._order(), start=1)]
+            for job, position in updates:
+                try:
+                    await self.notify(job, position)
+                except Exception:
+                    # Прогресс не критичен (например, сообщение уже удалено)
+                    pass
+
+    def start(self) -> None:
+        """Запустить воркеры (в работающем event loop)"""
+        if self._tasks:
+            return
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._progress()))
+
+    async def stop(self) -> None:
+        """Остановить воркеры; ожидающие задачи отбрасываются"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
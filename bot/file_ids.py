@@ -0,0 +1,44 @@
+"""Кэш file_id отправленных превью: повторная отправка без рендера и загрузки"""
+
+import json
+from typing import Optional, Tuple
+
+from generator.render_cache import RenderCache
+
+
+class FileIdCache:
+    """
+    file_id фото в Telegram по ключу превью (render_key)
+
+    После успешной отправки Telegram возвращает file_id, по которому то же
+    фото можно отправить повторно без загрузки. Записи хранятся в
+    RenderCache (LRU в памяти + диск), поэтому переживают перезапуск бота.
+    file_id привязан к токену бота - при смене бота каталог нужно очистить.
+    """
+
+    def __init__(self, memory_items: int = 10000, disk_dir: Optional[str] = None,
+                 disk_bytes: int = 16 * 1024 * 1024):
+        self._cache = RenderCache(memory_items=memory_items, memory_bytes=disk_bytes,
+                                  disk_dir=disk_dir, disk_bytes=disk_bytes)
+
+    def get(self, key: str) -> Optional[Tuple[str, int]]:
+        """(file_id, размер изображения в байтах) или None"""
+        data = self._cache.get(key)
+        if data is None:
+            return None
+        try:
+            entry = json.loads(data)
+            return entry["file_id"], int(entry.get("size", 0))
+        except (ValueError, KeyError, TypeError):
+            self._cache.delete(key)
+            return None
+
+    def put(self, key: str, file_id: str, size: int) -> None:
+        self._cache.put(key, json.dumps({"file_id": file_id, "size": size}).encode('utf-8'))
+
+    def discard(self, key: str) -> None:
+        """Забыть file_id (Telegram его больше не принимает)"""
+        self._cache.delete(key)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
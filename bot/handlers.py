@@ -1,11 +1,14 @@
 """Обработчики команд и сообщений Telegram бота"""
 
+import asyncio
+import hashlib
 import os
 import cv2
 import numpy as np
 from io import BytesIO
-from typing import Optional
-from telegram import Update
+from typing import Optional, Sequence
+from telegram import InputMediaPhoto, Message, PhotoSize, Update
+from telegram.error import BadRequest, TelegramError
 from telegram.ext import (
     ContextTypes,
     ConversationHandler,
@@ -22,19 +25,79 @@ from .keyboards import (
     get_style_keyboard,
     get_gradient_colors_keyboard,
 )
+from .ai_queue import AIJob, AIJobQueue, QueueFullError
+from .file_ids import FileIdCache
+from .rate_limit import RateLimiter, budget_for, format_retry_after
+from .render_pool import RenderPool
+from .speculation import SpeculativeAI
+from . import metrics
+from generator import jobs
+from generator.encoder import ImageEncoder
 from generator.image_generator import ImageGenerator
 from generator.ai_generator import AIImageGenerator
+from generator.ai_cache import AIImageCache
+from generator.render_cache import RenderCache, render_key
 from config import settings
 
 
 # Инициализация генераторов
-image_generator = ImageGenerator(settings.fonts_dir)
+image_generator = ImageGenerator(
+    settings.fonts_dir,
+    encoder=ImageEncoder(
+        settings.image_format,
+        settings.image_quality,
+        png_compress_level=settings.png_compress_level,
+        style_formats=settings.image_format_overrides,
+    ),
+)
+
+# Пул воркеров для рендера (не блокирует event loop)
+render_pool = RenderPool(image_generator, settings.render_pool, settings.render_workers)
+
+# Кэш готовых превью (AI-стиль не кэшируется - результат каждый раз новый)
+render_cache = RenderCache(
+    memory_items=settings.render_cache_memory_items,
+    memory_bytes=settings.render_cache_memory_mb * 1024 * 1024,
+    disk_dir=settings.render_cache_dir,
+    disk_bytes=settings.render_cache_disk_mb * 1024 * 1024,
+)
+
+# Лимиты частоты запросов по бюджетам (AI, свой фон, дешевые стили)
+rate_limiter = RateLimiter(settings.rate_limits_user, settings.rate_limits_global)
+
+# file_id уже отправленных превью: повтор отправляется без рендера и загрузки
+file_ids = FileIdCache(
+    memory_items=settings.file_id_cache_items,
+    disk_dir=settings.file_id_cache_dir,
+)
 ai_generator = None
 
 # AI-генератор только если ключ валиден (не placeholder и не пустой)
 if settings.vsellm_api_key and not settings.vsellm_api_key.startswith('__n8n_BLANK_VALUE'):
     try:
-        ai_generator = AIImageGenerator(settings.vsellm_api_key, settings.vsellm_api_url)
+        ai_generator = AIImageGenerator(
+            settings.vsellm_api_key,
+            settings.vsellm_api_url,
+            connect_timeout=settings.ai_connect_timeout,
+            read_timeout=settings.ai_read_timeout,
+            max_concurrency=settings.ai_max_concurrency,
+            max_connections=settings.ai_max_connections,
+            cache=AIImageCache(
+                memory_items=settings.ai_cache_memory_items,
+                memory_bytes=settings.ai_cache_memory_mb * 1024 * 1024,
+                disk_dir=settings.ai_cache_dir,
+                disk_bytes=settings.ai_cache_disk_mb * 1024 * 1024,
+                ttl=settings.ai_cache_ttl,
+                decode_size=(image_generator.width, image_generator.height),
+            ) if settings.ai_cache_ttl > 0 else None,
+            retry_attempts=settings.ai_retry_attempts,
+            retry_base_delay=settings.ai_retry_base_delay,
+            retry_max_delay=settings.ai_retry_max_delay,
+            breaker_threshold=settings.ai_breaker_threshold,
+            breaker_reset=settings.ai_breaker_reset,
+            decode_size=(image_generator.width, image_generator.height),
+            hints_path=settings.meme_hints_path,
+        )
         print("[INFO] AI-генератор инициализирован")
     except Exception as e:
         print(f"[WARNING] Не удалось инициализировать AI-генератор: {e}")
@@ -43,6 +106,7 @@ else:
     print("[INFO] AI-генерация отключена (ключ не настроен)")
 
 
+
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Обработчик команды /start"""
     welcome_message = (
@@ -81,6 +145,8 @@ async def new_preview(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
     """Начало создания нового превью"""
     # Очищаем предыдущие данные
     context.user_data.clear()
+    if speculative_ai:
+        speculative_ai.discard(update.effective_user.id)
 
     await update.message.reply_text(
         "🎨 Отлично! Давай создадим превью для твоего поста.\n\n"
@@ -96,6 +162,18 @@ async def style_chosen(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
     await query.answer()
 
     style = query.data.replace("style_", "")
+
+    # Лимит исчерпан - предупреждаем сразу, до ввода заголовка
+    budget = budget_for(style if style != 'ai' or ai_generator else 'gradient')
+    retry_after = rate_limiter.peek(budget, update.effective_user.id)
+    if retry_after:
+        await query.edit_message_text(
+            f"⏳ Лимит превью в стиле «{get_style_name(style)}» исчерпан. "
+            f"Попробуй через {format_retry_after(retry_after)} или выбери другой стиль:",
+            reply_markup=get_style_keyboard()
+        )
+        return CHOOSING_STYLE
+
     context.user_data['style'] = style
 
     # Если выбран градиент, предлагаем выбрать цветовую схему
@@ -146,19 +224,45 @@ async def gradient_color_chosen(update: Update, context: ContextTypes.DEFAULT_TY
     return ENTERING_TITLE
 
 
+def pick_photo_size(photos: Sequence[PhotoSize], width: int, height: int) -> PhotoSize:
+    """Наименьший вариант фото, который покрывает холст (иначе самый большой)"""
+    by_area = sorted(photos, key=lambda p: p.width * p.height)
+    for photo in by_area:
+        if photo.width >= width and photo.height >= height:
+            return photo
+    return by_area[-1]
+
+
+def cleanup_temp_backgrounds(temp_dir: str) -> int:
+    """Удалить файлы фонов bg_*.jpg, оставшиеся от прежних версий и прерванных диалогов"""
+    removed = 0
+    if not os.path.isdir(temp_dir):
+        return removed
+    for entry in os.scandir(temp_dir):
+        if entry.is_file() and entry.name.startswith('bg_') and entry.name.endswith('.jpg'):
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                pass
+    return removed
+
+
+async def download_background(bot, file_id: str) -> bytes:
+    """Скачать фон в память"""
+    with metrics.stage_timer(metrics.TG_DOWNLOAD, style='custom'):
+        file = await bot.get_file(file_id)
+        return bytes(await file.download_as_bytearray())
+
+
 async def custom_background_received(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Обработка загрузки пользовательского фона"""
     if update.message.photo:
-        # Получаем фото в лучшем качестве
-        photo = update.message.photo[-1]
-        file = await photo.get_file()
-
-        # Сохраняем во временную директорию
-        os.makedirs(settings.temp_dir, exist_ok=True)
-        file_path = os.path.join(settings.temp_dir, f"bg_{update.effective_user.id}.jpg")
-        await file.download_to_drive(file_path)
-
-        context.user_data['custom_bg_path'] = file_path
+        # Достаточно наименьшего размера, который покрывает холст - меньше трафика и декодирования
+        photo = pick_photo_size(update.message.photo, image_generator.width, image_generator.height)
+        # Фон хранится в памяти до рендера, без временного файла
+        context.user_data['custom_bg'] = await download_background(context.bot, photo.file_id)
+        context.user_data['custom_bg_file_id'] = photo.file_id
 
         await update.message.reply_text(
             "✅ Фон загружен!\n\n"
@@ -189,6 +293,11 @@ async def title_received(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     title = update.message.text
     context.user_data['title'] = title
 
+    # AI-генерация по заголовку начинается сразу, не дожидаясь описания. Это платный
+    # запрос: токен AI-бюджета списывается сейчас, место в очереди бронируется
+    if speculative_ai and context.user_data.get('style') == 'ai' and ai_generator.available():
+        speculative_ai.start(update.effective_user.id, title)
+
     await update.message.reply_text(
         "✅ Заголовок сохранен!\n\n"
         "Теперь введи описание (или отправь /skip чтобы пропустить):"
@@ -201,65 +310,379 @@ async def description_received(update: Update, context: ContextTypes.DEFAULT_TYP
     description = update.message.text
     context.user_data['description'] = description
 
-    await update.message.reply_text("⏳ Генерирую превью...")
-    await generate_and_send(update, context)
+    status_message = await update.message.reply_text("⏳ Генерирую превью...")
+    await generate_and_send(update, context, status_message)
     return ConversationHandler.END
 
 
 async def skip_description(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Пропуск описания"""
-    await update.message.reply_text("⏳ Генерирую превью...")
-    await generate_and_send(update, context)
+    status_message = await update.message.reply_text("⏳ Генерирую превью...")
+    await generate_and_send(update, context, status_message)
     return ConversationHandler.END
 
 
-async def generate_and_send(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+def preview_key(style: str, title: str, description: Optional[str],
+                gradient_type: str = 'ocean', bg_data: Optional[bytes] = None) -> str:
+    """Ключ превью без AI (кэш рендера и кэш file_id)"""
+    if style not in ('minimal', 'custom'):
+        # Градиент и fallback для неизвестных стилей
+        style = 'gradient'
+
+    return render_key(
+        style, title, description,
+        gradient_type if style == 'gradient' else None,
+        width=image_generator.width, height=image_generator.height,
+        encoding=image_generator.encoder.signature(style),
+        # Хэш содержимого пользовательского фона
+        background=hashlib.sha256(bg_data).hexdigest() if style == 'custom' and bg_data else "",
+    )
+
+
+async def render_static(style: str, title: str, description: Optional[str],
+                        gradient_type: str = 'ocean', bg_data: Optional[bytes] = None) -> bytes:
+    """Рендер стилей без AI в пуле воркеров с использованием кэша готовых превью"""
+    if style not in ('minimal', 'custom'):
+        style = 'gradient'
+    key = preview_key(style, title, description, gradient_type, bg_data)
+
+    # Дисковый уровень кэша читается и пишется в потоке, не блокируя event loop
+    cached = await asyncio.to_thread(render_cache.get, key)
+    if cached is not None:
+        return cached
+
+    data = await render_pool.run(jobs.render, style, title, description, gradient_type,
+                                 background_data=bg_data)
+    await asyncio.to_thread(render_cache.put, key, data)
+    return data
+
+
+async def render_ai(title: str, description: Optional[str],
+                    speculative: Optional[asyncio.Task] = None) -> Optional[bytes]:
+    """AI-генерация (мемный стиль без текста); None - AI не сработал"""
+    if speculative is not None:
+        # Запрос по заголовку уже идет (или завершен) с момента ввода заголовка
+        ai_image = await speculative
+    else:
+        prompt = ai_generator.create_prompt_from_title(title, description)
+        ai_image = await ai_generator.generate_illustration(prompt)
+    if ai_image is None:
+        return None
+    # Используем чистое AI-изображение без текста
+    return await render_pool.run(jobs.render_ai, ai_image)
+
+
+async def generate_and_send(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                            status_message: Optional[Message] = None) -> None:
     """Генерация и отправка изображения"""
     title = context.user_data.get('title', 'Заголовок')
     description = context.user_data.get('description')
     style = context.user_data.get('style', 'gradient')
 
-    try:
-        # Генерируем изображение в зависимости от стиля
-        if style == 'minimal':
-            image_bytes = image_generator.generate_minimal(title, description)
-        elif style == 'gradient':
-            gradient_type = context.user_data.get('gradient_type', 'ocean')
-            image_bytes = image_generator.generate_gradient(title, description, gradient_type)
-        elif style == 'custom':
-            bg_path = context.user_data.get('custom_bg_path')
-            image_bytes = image_generator.generate_with_background(title, description, bg_path)
-        elif style == 'ai' and ai_generator:
-            # AI-генерация (мемный стиль без текста)
-            prompt = ai_generator.create_prompt_from_title(title, description)
-            ai_image = ai_generator.generate_illustration(prompt)
-            if ai_image is not None:
-                # Используем чистое AI-изображение без текста
-                image_bytes = image_generator.generate_ai_only(ai_image)
-            else:
-                # Fallback на градиент если AI не сработал
-                image_bytes = image_generator.generate_gradient(title, description)
+    # При разомкнутом circuit breaker AI-запрос не ставится в очередь: сразу градиент
+    use_ai = style == 'ai' and ai_queue is not None and ai_generator.available()
+
+    speculative, prepaid = None, False
+    if speculative_ai:
+        if use_ai:
+            speculative, prepaid = speculative_ai.take(update.effective_user.id, title, description)
+        else:
+            # AI недоступен - упреждающий запрос не понадобится
+            speculative_ai.discard(update.effective_user.id)
+
+    # Превью сверх лимита отклоняется сразу, а не копится в очереди. Если был
+    # упреждающий запрос, токен за AI-превью уже списан при вводе заголовка
+    budget = budget_for(style if use_ai or style != 'ai' else 'gradient')
+    retry_after = 0 if prepaid else rate_limiter.acquire(budget, update.effective_user.id)
+    if retry_after:
+        metrics.REQUESTS.inc(style=style, outcome=metrics.REJECTED)
+        text = (f"⏳ Слишком много превью подряд. Попробуй через "
+                f"{format_retry_after(retry_after)}: /new")
+        if status_message is not None:
+            await status_message.edit_text(text)
         else:
-            # Fallback
-            image_bytes = image_generator.generate_gradient(title, description)
+            await update.message.reply_text(text)
+        context.user_data.pop('custom_bg', None)
+        return
 
-        # Отправляем изображение
-        await update.message.reply_photo(
-            photo=image_bytes,
-            caption=f"✅ Готово! Твое превью для поста:\n\n📝 {title}"
+    # AI-генерация уходит в фоновую очередь, диалог завершается сразу
+    if use_ai:
+        await submit_ai_job(update, context, status_message, speculative)
+        return
+
+    gradient_type = context.user_data.get('gradient_type', 'ocean')
+    bg_data = context.user_data.get('custom_bg')
+    caption = f"✅ Готово! Твое превью для поста:\n\n📝 {title}"
+
+    try:
+        with metrics.track(style) as request:
+            if style == 'ai':
+                # AI недоступен (breaker разомкнут) - сразу градиент
+                request.outcome = metrics.FALLBACK
+
+            if style == 'custom' and bg_data is None and context.user_data.get('custom_bg_file_id'):
+                # Байты фона не сохраняются между перезапусками - скачиваем заново
+                bg_data = await download_background(context.bot, context.user_data['custom_bg_file_id'])
+
+            await send_preview(update, style, title, description, caption,
+                               gradient_type=gradient_type, bg_data=bg_data)
+
+    except Exception as e:
+        await update.message.reply_text(
+            f"❌ Произошла ошибка при генерации: {str(e)}\n\n"
+            "Попробуй снова с помощью /new"
         )
+    finally:
+        # Фон больше не нужен - освобождаем память
+        context.user_data.pop('custom_bg', None)
+
+
+async def send_preview(update: Update, style: str, title: str, description: Optional[str],
+                       caption: str, gradient_type: str = 'ocean',
+                       bg_data: Optional[bytes] = None) -> Message:
+    """Отправить превью без AI (для стиля ai - градиент) ответом на сообщение"""
+    # Такое превью уже отправлялось - пересылаем по file_id без рендера и загрузки
+    key = preview_key(style, title, description, gradient_type, bg_data)
+    sent = await _send_cached(update, key, style, caption)
+    if sent is not None:
+        return sent
+
+    image_bytes = await render_static(
+        style, title, description, gradient_type=gradient_type, bg_data=bg_data,
+    )
+    with metrics.stage_timer(metrics.TG_UPLOAD, style=style):
+        sent = await update.message.reply_photo(photo=image_bytes, caption=caption)
+    if sent.photo:
+        # Самый крупный размер - исходное изображение
+        await asyncio.to_thread(file_ids.put, key, sent.photo[-1].file_id, len(image_bytes))
+    return sent
+
+
+async def _send_cached(update: Update, key: str, style: str, caption: str) -> Optional[Message]:
+    """Отправить превью по сохраненному file_id; None - нужно рендерить"""
+    # Записи file_id лежат в том же двухуровневом кэше с диском - обращения в потоке
+    cached = await asyncio.to_thread(file_ids.get, key)
+    if cached is None:
+        metrics.FILE_ID_REUSE.inc(style=style, result="miss")
+        return None
+
+    file_id, size = cached
+    try:
+        with metrics.stage_timer(metrics.TG_UPLOAD, style=style):
+            sent = await update.message.reply_photo(photo=file_id, caption=caption)
+    except BadRequest:
+        # file_id больше не принимается (например, сменился токен бота)
+        await asyncio.to_thread(file_ids.discard, key)
+        metrics.FILE_ID_REUSE.inc(style=style, result="stale")
+        return None
+
+    metrics.FILE_ID_REUSE.inc(style=style, result="hit")
+    metrics.UPLOAD_BYTES_SAVED.inc(size, style=style)
+    return sent
+
+
+def _format_progress(job: AIJob, position: int) -> str:
+    """Подпись превью-заглушки, пока AI-задача в работе"""
+    elapsed = f"⏱ Прошло: {int(job.elapsed)} с"
+    if position:
+        status = f"⏳ AI-иллюстрация в очереди, позиция: {position}"
+    else:
+        status = "🎨 Генерирую AI-иллюстрацию..."
+    return f"{status}\n{elapsed}\n\nПока - превью с градиентом:\n📝 {job.title}"
+
+
+def _queue_full_text(error: QueueFullError) -> str:
+    if error.per_user:
+        return ("⏳ У тебя уже генерируется AI-превью. Дождись результата "
+                "или выбери другой стиль: /new")
+    return ("⚠️ Сейчас слишком много AI-генераций. Попробуй чуть позже "
+            "или выбери другой стиль: /new")
+
+
+async def _set_caption(job: AIJob, caption: str) -> None:
+    await job.bot.edit_message_caption(
+        chat_id=job.chat_id,
+        message_id=job.status_message_id,
+        caption=caption,
+    )
+
 
-        # Очищаем временные файлы
-        if 'custom_bg_path' in context.user_data:
-            bg_path = context.user_data['custom_bg_path']
-            if os.path.exists(bg_path):
-                os.remove(bg_path)
+async def _notify_ai_progress(job: AIJob, position: int) -> None:
+    """Обновить подпись заглушки (позиция в очереди и время ожидания)"""
+    async with job.caption_lock:
+        # Устаревший статус не перезаписывает более новый: позиция в очереди -
+        # после старта задачи, прогресс - после результата
+        if job.finished or (position and job.started is not None):
+            return
+        await _set_caption(job, _format_progress(job, position))
+
+
+async def _finish_caption(job: AIJob, caption: str, image_bytes: Optional[bytes] = None) -> None:
+    """Итог задачи: подпись или замена заглушки AI-иллюстрацией"""
+    async with job.caption_lock:
+        job.finished = True
+        if image_bytes is None:
+            await _set_caption(job, caption)
+            return
+        with metrics.stage_timer(metrics.TG_UPLOAD, style='ai'):
+            await job.bot.edit_message_media(
+                media=InputMediaPhoto(image_bytes, caption=caption),
+                chat_id=job.chat_id,
+                message_id=job.status_message_id,
+            )
+
+
+async def _run_ai_job(job: AIJob) -> None:
+    """Выполнить AI-задачу из очереди и заменить заглушку результатом"""
+    try:
+        await _notify_ai_progress(job, 0)
+    except TelegramError:
+        pass
 
+    done = f"✅ Готово! Твое превью для поста:\n\n📝 {job.title}"
+    try:
+        with metrics.track('ai'):
+            image_bytes = await render_ai(job.title, job.description, job.speculative)
+            if image_bytes is None:
+                # AI не сработал - градиентная заглушка остается результатом
+                metrics.set_outcome(metrics.FALLBACK)
+                await _finish_caption(job, done + "\n\n⚠️ AI-иллюстрация недоступна, оставили градиент")
+                return
+            await _finish_caption(job, done, image_bytes)
     except Exception as e:
+        try:
+            await _finish_caption(job, f"⚠️ Не удалось сгенерировать AI-иллюстрацию: {str(e)}\n\n"
+                                    f"Превью с градиентом выше можно использовать.\n📝 {job.title}")
+        except TelegramError:
+            pass
+
+
+# Фоновая очередь AI-генераций (только если AI настроен)
+ai_queue = AIJobQueue(
+    _run_ai_job,
+    _notify_ai_progress,
+    workers=settings.ai_queue_workers,
+    max_pending=settings.ai_queue_size,
+    max_per_user=settings.ai_queue_per_user,
+    progress_interval=settings.ai_progress_interval,
+) if ai_generator else None
+
+# Упреждающий AI-запрос по заголовку, пока пользователь пишет описание
+speculative_ai = SpeculativeAI(
+    ai_generator,
+    ai_queue,
+    rate_limiter,
+    policy=settings.speculative_ai_policy,
+    reuse_after=settings.speculative_ai_reuse_after,
+) if ai_generator and settings.speculative_ai else None
+
+
+async def submit_ai_job(update: Update, context: ContextTypes.DEFAULT_TYPE,
+                        status_message: Optional[Message] = None,
+                        speculative: Optional[asyncio.Task] = None) -> None:
+    """
+    Поставить AI-генерацию в очередь
+
+    Сразу отправляется градиентное превью с тем же текстом (заглушка): в его
+    подписи показывается прогресс, а готовая AI-иллюстрация заменяет его на
+    месте (edit_message_media). Если AI не сработал, заглушка остается.
+    speculative - упреждающий запрос по заголовку, результат которого
+    использует задача (отменяется, если задачу не приняли).
+    """
+    title = context.user_data.get('title', 'Заголовок')
+    description = context.user_data.get('description')
+
+    try:
+        ai_queue.check(update.effective_user.id)
+    except QueueFullError as e:
+        metrics.REQUESTS.inc(style='ai', outcome=metrics.REJECTED)
+        if speculative is not None:
+            speculative.cancel()
+        if status_message is not None:
+            await status_message.edit_text(_queue_full_text(e))
+        else:
+            await update.message.reply_text(_queue_full_text(e))
+        return
+
+    try:
+        with metrics.stage_style('ai'), metrics.stage_timer(metrics.FIRST_IMAGE):
+            placeholder = await send_preview(update, 'ai', title, description,
+                                             f"⏳ AI-иллюстрация в очереди\n\n📝 {title}")
+    except Exception as e:
+        metrics.REQUESTS.inc(style='ai', outcome=metrics.ERROR)
+        if speculative is not None:
+            speculative.cancel()
         await update.message.reply_text(
             f"❌ Произошла ошибка при генерации: {str(e)}\n\n"
             "Попробуй снова с помощью /new"
         )
+        return
+    if status_message is not None:
+        # Текстовый статус больше не нужен - прогресс в подписи заглушки
+        try:
+            await status_message.delete()
+        except TelegramError:
+            pass
+
+    job = AIJob(
+        context.bot,
+        update.effective_user.id,
+        update.effective_chat.id,
+        placeholder.message_id,
+        title,
+        description,
+        speculative,
+    )
+
+    try:
+        position = await ai_queue.submit(job)
+    except QueueFullError as e:
+        # Очередь заполнилась, пока отправлялась заглушка - она и остается результатом
+        metrics.REQUESTS.inc(style='ai', outcome=metrics.REJECTED)
+        if speculative is not None:
+            speculative.cancel()
+        await _set_caption(job, f"{_queue_full_text(e)}\n\n📝 {title}")
+        return
+
+    try:
+        await _notify_ai_progress(job, position)
+    except TelegramError:
+        pass
+
+
+def _breaker_metrics(snapshot: dict) -> dict:
+    values = {key: value for key, value in snapshot.items() if key not in ("name", "state")}
+    values["open"] = snapshot["state"] == "open"
+    return values
+
+
+def register_metrics() -> None:
+    """Gauge-метрики состояния AI-клиента, очереди и кэшей для /metrics"""
+    metrics.REGISTRY.gauge(
+        "render_cache", "Render cache counters and occupancy", "field", render_cache.stats)
+    metrics.REGISTRY.gauge(
+        "rate_limit", "Requests rejected by rate limits and tracked user buckets", "field",
+        rate_limiter.stats)
+    metrics.REGISTRY.gauge(
+        "file_id_cache", "Telegram file_id cache counters and occupancy", "field", file_ids.stats)
+    if ai_generator is None:
+        return
+    metrics.REGISTRY.gauge(
+        "ai_circuit_breaker", "vsellm circuit breaker state (open: 1/0) and counters", "field",
+        lambda: _breaker_metrics(ai_generator.breaker.snapshot()))
+    if speculative_ai is not None:
+        metrics.REGISTRY.gauge(
+            "ai_speculation_pending", "Speculative AI requests waiting for the description", "",
+            lambda: {"": speculative_ai.pending})
+    if ai_queue is not None:
+        metrics.REGISTRY.gauge(
+            "ai_queue_jobs", "AI jobs waiting and running, slots reserved by speculation", "state",
+            lambda: {"pending": ai_queue.pending, "running": ai_queue.running,
+                     "reserved": ai_queue.reserved})
+    if ai_generator.cache is not None:
+        metrics.REGISTRY.gauge(
+            "ai_cache", "AI illustration cache counters and occupancy", "field",
+            ai_generator.cache.stats)
 
 
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -268,6 +691,8 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         "❌ Создание превью отменено.\n\n"
         "Используй /new чтобы начать заново."
     )
+    if speculative_ai:
+        speculative_ai.discard(update.effective_user.id)
     context.user_data.clear()
     return ConversationHandler.END
 
@@ -292,5 +717,8 @@ def get_gradient_name(gradient_type: str) -> str:
         'forest': '🌲 Лес',
         'night': '🌃 Ночь',
         'fire': '🔥 Огонь',
+        'aurora': '🌌 Аврора',
+        'glow': '💜 Сияние',
+        'dusk': '🌆 Сумерки',
     }
     return names.get(gradient_type, gradient_type)
@@ -44,5 +44,10 @@ def get_gradient_colors_keyboard() -> InlineKeyboardMarkup:
             InlineKeyboardButton("🌃 Ночь", callback_data="gradient_night"),
             InlineKeyboardButton("🔥 Огонь", callback_data="gradient_fire"),
         ],
+        [
+            InlineKeyboardButton("🌌 Аврора", callback_data="gradient_aurora"),
+            InlineKeyboardButton("💜 Сияние", callback_data="gradient_glow"),
+            InlineKeyboardButton("🌆 Сумерки", callback_data="gradient_dusk"),
+        ],
     ]
     return InlineKeyboardMarkup(keyboard)
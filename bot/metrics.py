@@ -0,0 +1,285 @@
+"""Метрики бота в формате Prometheus и HTTP-эндпоинт /metrics
+
+Без внешних зависимостей: счетчики и гистограммы хранятся в памяти
+процесса бота, эндпоинт обслуживается потоком http.server.
+
+Метрики:
+  preview_requests_total{style, outcome}          - запросы превью
+  preview_request_seconds{style, outcome}         - полное время запроса
+  preview_stage_seconds{stage, style}             - стадии: font_load, layout,
+      draw, background, encode, ai_http, ai_decode, tg_download, tg_upload,
+      first_image (время до заглушки AI-превью)
+  telegram_file_id_total{style, result}           - повторная отправка по file_id
+  telegram_upload_saved_bytes_total{style}        - сэкономленная загрузка
+  ai_speculation_total{result}                    - упреждающие AI-запросы
+      (hit/reused - пригодились, restarted/abandoned - потрачены впустую)
+плюс gauge состояния AI circuit breaker, очереди AI и кэшей.
+
+Стиль запроса задается контекстом track(style); стадии, замеренные
+внутри него (в том числе в воркерах пула рендера), получают этот стиль.
+"""
+
+import contextvars
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+from generator import stages
+
+logger = logging.getLogger(__name__)
+
+# Границы гистограмм (секунды): от миллисекунд рендера до минут AI-генерации
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+                   30.0, 60.0, 120.0, 300.0)
+
+OK = "ok"
+ERROR = "error"
+FALLBACK = "fallback"
+REJECTED = "rejected"
+
+TG_DOWNLOAD = "tg_download"
+TG_UPLOAD = "tg_upload"
+# От запроса AI-превью до отправки градиентной заглушки
+FIRST_IMAGE = "first_image"
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Монотонный счетчик с метками"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами и метками"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # метки -> (счетчики по границам, сумма, количество)
+        self._values: dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Набор метрик и функций, отдающих значения в момент запроса (gauge)"""
+
+    def __init__(self):
+        self._metrics: list = []
+        self._gauges: list[Tuple[str, str, str, Callable[[], dict]]] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, documentation: str, label: str,
+              func: Callable[[], dict]) -> None:
+        """Gauge со значениями {значение метки: число}, вычисляемыми при каждом запросе"""
+        self._gauges.append((name, documentation, label, func))
+
+    def expose(self) -> str:
+        """Текст в формате Prometheus exposition"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        for name, documentation, label, func in self._gauges:
+            try:
+                values = func()
+            except Exception as e:
+                logger.warning("Метрика %s недоступна: %s", name, e)
+                continue
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            for label_value, value in sorted(values.items()):
+                labels = _format_labels((label,), (label_value,)) if label else ""
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.register(Counter(
+    "preview_requests_total", "Preview requests by style and outcome", ("style", "outcome")))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "preview_request_seconds", "Full preview request latency", ("style", "outcome")))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "preview_stage_seconds", "Preview pipeline stage latency", ("stage", "style")))
+FILE_ID_REUSE = REGISTRY.register(Counter(
+    "telegram_file_id_total", "Cached file_id lookups (hit, miss, stale)", ("style", "result")))
+SPECULATION = REGISTRY.register(Counter(
+    "ai_speculation_total",
+    "Speculative AI requests: started, hit, reused, restarted, abandoned", ("result",)))
+UPDATES_DROPPED = REGISTRY.register(Counter(
+    "bot_updates_dropped_total", "Updates dropped because the user's queue was full"))
+UPLOAD_BYTES_SAVED = REGISTRY.register(Counter(
+    "telegram_upload_saved_bytes_total", "Image bytes not uploaded thanks to file_id reuse",
+    ("style",)))
+
+
+class RequestTracker:
+    """Контекст одного запроса превью; outcome можно уточнить до выхода"""
+
+    def __init__(self, style: str):
+        self.style = style
+        self.outcome = OK
+
+
+_current: contextvars.ContextVar[Optional[RequestTracker]] = contextvars.ContextVar(
+    "metrics_request", default=None)
+
+
+@contextmanager
+def track(style: str) -> Iterator[RequestTracker]:
+    """Замерить запрос превью: счетчик и гистограмма по стилю и исходу"""
+    tracker = RequestTracker(style)
+    token = _current.set(tracker)
+    start = time.perf_counter()
+    try:
+        yield tracker
+    except BaseException:
+        tracker.outcome = ERROR
+        raise
+    finally:
+        _current.reset(token)
+        REQUESTS.inc(style=style, outcome=tracker.outcome)
+        REQUEST_SECONDS.observe(time.perf_counter() - start, style=style, outcome=tracker.outcome)
+
+
+@contextmanager
+def stage_style(style: str) -> Iterator[None]:
+    """
+    Стадии вне track() (упреждающий запрос, заглушка AI-превью) относятся к style
+
+    Действует и на задачи, созданные внутри блока (они копируют контекст);
+    запрос при этом не считается.
+    """
+    token = _current.set(RequestTracker(style))
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def set_outcome(outcome: str) -> None:
+    """Уточнить исход текущего запроса (например, fallback на градиент)"""
+    tracker = _current.get()
+    if tracker is not None:
+        tracker.outcome = outcome
+
+
+def observe_stage(name: str, seconds: float, style: Optional[str] = None) -> None:
+    if style is None:
+        tracker = _current.get()
+        style = tracker.style if tracker is not None else ""
+    STAGE_SECONDS.observe(seconds, stage=name, style=style)
+
+
+def observe_stages(timings: dict) -> None:
+    """Стадии, собранные в воркере пула рендера"""
+    for name, seconds in timings.items():
+        observe_stage(name, seconds)
+
+
+@contextmanager
+def stage_timer(name: str, style: Optional[str] = None) -> Iterator[None]:
+    """Замерить стадию на стороне бота (скачивание/отправка в Telegram)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start, style)
+
+
+# Стадии генератора в процессе бота (AI HTTP, AI decode) - в метрики
+stages.set_observer(observe_stage)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        if self.path.split('?', 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = REGISTRY.expose().encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # Запросы скрейпера не пишем в лог
+        pass
+
+
+def start_server(host: str, port: int) -> ThreadingHTTPServer:
+    """Запустить эндпоинт /metrics в фоновом потоке"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics", daemon=True)
+    thread.start()
+    return server
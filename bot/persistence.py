@@ -0,0 +1,371 @@
+"""Хранение состояния диалогов и user_data между перезапусками бота
+
+StorePersistence - реализация BasePersistence поверх подключаемого
+хранилища StateStore (пространство имен -> ключ -> JSON). В комплекте
+SQLiteStore (один узел) и RedisStore (общее хранилище для нескольких
+узлов, нужен пакет redis); другое хранилище подключается реализацией
+четырех методов StateStore.
+
+Запись отложенная и пакетная: Application сам вызывает update_* раз в
+update_interval секунд, изменения сериализуются сразу (снимок), а на диск
+уходят одной транзакцией в потоке, не блокируя обработку обновлений.
+
+Сохраняются только user_data и состояния ConversationHandler. Временные
+данные (TRANSIENT_KEYS, например байты фона) не сохраняются - после
+перезапуска фон заново скачивается по custom_bg_file_id.
+
+Application загружает состояние только при старте. Для нескольких
+экземпляров бота, которые обслуживают одних и тех же пользователей,
+включается режим shared (shared_state_handlers): перед каждым обновлением
+user_data и состояние диалога пользователя перечитываются из хранилища,
+после обработки изменения записываются сразу, а не раз в update_interval.
+Конфликты разрешаются по ключу (пользователь, диалог): побеждает
+последняя запись.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Iterable, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import (
+    Application,
+    BasePersistence,
+    ContextTypes,
+    ConversationHandler,
+    PersistenceInput,
+    TypeHandler,
+)
+
+logger = logging.getLogger(__name__)
+
+# Ключи user_data, которые живут только в памяти процесса
+TRANSIENT_KEYS = frozenset({'custom_bg'})
+
+USER_DATA = "user_data"
+CONVERSATION_PREFIX = "conversation:"
+
+# Запись пакета: (пространство имен, ключ, JSON или None - удалить)
+Write = Tuple[str, str, Optional[str]]
+
+# Группы обработчиков режима shared: до и после всех обработчиков бота
+REFRESH_GROUP = -100
+SYNC_GROUP = 100
+
+
+class StateStore(ABC):
+    """Хранилище состояния: пространство имен -> {ключ: JSON-строка}"""
+
+    @abstractmethod
+    def load(self, namespace: str) -> dict[str, str]:
+        """Все записи пространства имен"""
+
+    @abstractmethod
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        """Одна запись или None"""
+
+    @abstractmethod
+    def write(self, batch: Iterable[Write]) -> None:
+        """Записать пакет изменений атомарно (значение None удаляет запись)"""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Освободить ресурсы"""
+
+
+class SQLiteStore(StateStore):
+    """Хранилище в одном файле SQLite (WAL: чтение не блокирует запись)"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS state ("
+            " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT NOT NULL,"
+            " updated REAL NOT NULL, PRIMARY KEY (namespace, key))"
+        )
+        self._db.commit()
+
+    def load(self, namespace: str) -> dict[str, str]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, value FROM state WHERE namespace = ?", (namespace,)).fetchall()
+        return dict(rows)
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value FROM state WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+        return row[0] if row else None
+
+    def write(self, batch: Iterable[Write]) -> None:
+        now = time.time()
+        upserts = []
+        deletes = []
+        for namespace, key, value in batch:
+            if value is None:
+                deletes.append((namespace, key))
+            else:
+                upserts.append((namespace, key, value, now))
+        with self._lock, self._db:
+            if upserts:
+                self._db.executemany(
+                    "INSERT INTO state (namespace, key, value, updated) VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT (namespace, key) DO UPDATE"
+                    " SET value = excluded.value, updated = excluded.updated", upserts)
+            if deletes:
+                self._db.executemany(
+                    "DELETE FROM state WHERE namespace = ? AND key = ?", deletes)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+class RedisStore(StateStore):
+    """
+    Хранилище в Redis: хэш на пространство имен, общее для всех узлов
+
+    Args:
+        url: Адрес вида redis://host:6379/0
+        prefix: Префикс ключей Redis
+    """
+
+    def __init__(self, url: str, prefix: str = "preview_bot:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("Для хранения состояния в Redis установите пакет redis") from e
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+
+    def load(self, namespace: str) -> dict[str, str]:
+        return self._client.hgetall(self.prefix + namespace)
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        return self._client.hget(self.prefix + namespace, key)
+
+    def write(self, batch: Iterable[Write]) -> None:
+        pipe = self._client.pipeline(transaction=True)
+        for namespace, key, value in batch:
+            if value is None:
+                pipe.hdel(self.prefix + namespace, key)
+            else:
+                pipe.hset(self.prefix + namespace, key, value)
+        pipe.execute()
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def open_store(location: str) -> StateStore:
+    """Хранилище по адресу: redis://... или путь к файлу SQLite"""
+    if location.startswith(("redis://", "rediss://", "unix://")):
+        return RedisStore(location)
+    return SQLiteStore(location)
+
+
+def _conversation_key(key: tuple) -> str:
+    return json.dumps(list(key))
+
+
+class StorePersistence(BasePersistence):
+    """
+    Persistence для Application: user_data и состояния диалогов в StateStore
+
+    Args:
+        store: Хранилище состояния
+        update_interval: Период сохранения изменений, секунды
+        shared: Хранилище общее для нескольких экземпляров бота - состояние
+            пользователя перечитывается перед каждым обновлением
+    """
+
+    def __init__(self, store: StateStore, update_interval: float = 5, shared: bool = False):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False,
+                                        user_data=True, callback_data=False),
+            update_interval=update_interval,
+        )
+        self.store = store
+        self.shared = shared
+        self._pending: dict[Tuple[str, str], Optional[str]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        # Последние сохраненные (или поставленные в очередь) снимки:
+        # неизмененные данные не пишутся повторно
+        self._known: dict[Tuple[str, str], Optional[str]] = {}
+
+    # --- Отложенная запись ---
+
+    def _schedule(self, namespace: str, key: str, value: Optional[str]) -> None:
+        item = (namespace, key)
+        if item in self._known and self._known[item] == value:
+            return
+        self._known[item] = value
+        self._pending[item] = value
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._write_pending())
+
+    async def _write_pending(self) -> None:
+        # Даем Application вызвать update_* для всех изменений - одна транзакция на пакет
+        await asyncio.sleep(0)
+        while self._pending:
+            batch, self._pending = self._pending, {}
+            try:
+                await asyncio.to_thread(
+                    self.store.write, [(ns, key, value) for (ns, key), value in batch.items()])
+            except Exception as e:
+                logger.error("Не удалось сохранить состояние (%d записей): %s", len(batch), e)
+                # Вернем в очередь - запишется со следующим пакетом
+                for item, value in batch.items():
+                    self._pending.setdefault(item, value)
+                return
+
+    async def sync(self) -> None:
+        """Дождаться записи всех поставленных в очередь изменений"""
+        while self._flush_task is not None and not self._flush_task.done():
+            await asyncio.shield(self._flush_task)
+
+    async def _reload(self, namespace: str, key: str) -> Tuple[bool, Optional[str]]:
+        """
+        Перечитать запись (режим shared): (изменена другим экземпляром, значение)
+
+        Несохраненные локальные изменения новее хранилища - запись не читается.
+        """
+        item = (namespace, key)
+        if not self.shared or item in self._pending:
+            return False, None
+        value = await asyncio.to_thread(self.store.get, namespace, key)
+        if value == self._known.get(item):
+            return False, value
+        self._known[item] = value
+        return True, value
+
+    # --- user_data ---
+
+    async def get_user_data(self) -> dict[int, dict]:
+        rows = await asyncio.to_thread(self.store.load, USER_DATA)
+        self._known.update(((USER_DATA, key), value) for key, value in rows.items())
+        return {int(key): json.loads(value) for key, value in rows.items()}
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        snapshot = {key: value for key, value in data.items() if key not in TRANSIENT_KEYS}
+        self._schedule(USER_DATA, str(user_id), json.dumps(snapshot, ensure_ascii=False))
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._schedule(USER_DATA, str(user_id), None)
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        changed, value = await self._reload(USER_DATA, str(user_id))
+        if not changed:
+            return
+        # Временные данные этого процесса остаются, остальное - из хранилища
+        for key in [key for key in user_data if key not in TRANSIENT_KEYS]:
+            del user_data[key]
+        if value is not None:
+            user_data.update(json.loads(value))
+
+    # --- Состояния ConversationHandler ---
+
+    async def get_conversations(self, name: str) -> dict:
+        namespace = CONVERSATION_PREFIX + name
+        rows = await asyncio.to_thread(self.store.load, namespace)
+        self._known.update(((namespace, key), value) for key, value in rows.items())
+        return {tuple(json.loads(key)): json.loads(value) for key, value in rows.items()}
+
+    async def update_conversation(self, name: str, key: tuple, new_state: Optional[object]) -> None:
+        value = None if new_state is None else json.dumps(new_state)
+        self._schedule(CONVERSATION_PREFIX + name, _conversation_key(key), value)
+
+    async def refresh_conversation(self, name: str, key: tuple) -> Tuple[bool, Optional[object]]:
+        """Перечитать состояние диалога (режим shared): (изменено, состояние или None)"""
+        changed, value = await self._reload(CONVERSATION_PREFIX + name, _conversation_key(key))
+        return changed, (json.loads(value) if value is not None else None)
+
+    # --- Не используются ботом ---
+
+    async def get_chat_data(self) -> dict:
+        return {}
+
+    async def get_bot_data(self) -> dict:
+        return {}
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        pass
+
+    async def update_bot_data(self, data: dict) -> None:
+        pass
+
+    async def update_callback_data(self, data: object) -> None:
+        pass
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        pass
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        pass
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    async def flush(self) -> None:
+        """Записать оставшиеся изменения и закрыть хранилище (остановка бота)"""
+        if self._flush_task is not None:
+            await self._flush_task
+        await self._write_pending()
+        self.store.close()
+
+
+def shared_state_handlers(conversation: ConversationHandler) -> list[Tuple[TypeHandler, int]]:
+    """
+    Обработчики режима shared: (обработчик, группа) для Application.add_handler
+
+    Первый выполняется до всех обработчиков бота: user_data перечитывается
+    при создании контекста (refresh_user_data), состояние диалога - здесь.
+    Второй - после всех: изменения обновления сразу записываются в хранилище,
+    чтобы следующее обновление пользователя на другом экземпляре их увидело.
+    """
+
+    async def refresh(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        persistence = context.application.persistence
+        if not isinstance(persistence, StorePersistence):
+            return
+        if ((conversation.per_chat and update.effective_chat is None)
+                or (conversation.per_user and update.effective_user is None)):
+            return
+        # У ConversationHandler нет публичного API для чтения состояния по запросу,
+        # поэтому ключ и словарь состояний берутся из его внутренних полей (версия PTB
+        # закреплена в requirements.txt, поведение проверяет tests/test_persistence.py)
+        key = conversation._get_key(update)
+        changed, state = await persistence.refresh_conversation(conversation.name, key)
+        if not changed:
+            return
+        if state is None or state == ConversationHandler.END:
+            conversation._conversations.pop(key, None)
+        else:
+            conversation._conversations.update_no_track({key: state})
+
+    async def sync(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        application: Application = context.application
+        persistence = application.persistence
+        if not isinstance(persistence, StorePersistence):
+            return
+        if update.effective_user is not None:
+            application.mark_data_for_update_persistence(user_ids=update.effective_user.id)
+        await application.update_persistence()
+        await persistence.sync()
+
+    return [(TypeHandler(Update, refresh), REFRESH_GROUP), (TypeHandler(Update, sync), SYNC_GROUP)]
@@ -0,0 +1,134 @@
+"""Ограничение частоты запросов превью: token bucket на пользователя и общий
+
+Бюджеты раздельные по стоимости стиля: AI (квота API и долгая генерация),
+custom (скачивание и декодирование большого фона) и cheap (минимализм и
+градиент). Запрос проходит, только если токен есть и в бакете
+пользователя, и в общем бакете бюджета; иначе возвращается время, через
+которое стоит повторить.
+
+Вызывается только из обработчиков в event loop - блокировки не нужны.
+"""
+
+import time
+from typing import Callable, Optional, Tuple
+
+AI = "ai"
+CUSTOM = "custom"
+CHEAP = "cheap"
+BUDGETS = (AI, CUSTOM, CHEAP)
+
+# Как часто удалять простаивающие бакеты пользователей (число вызовов)
+PRUNE_EVERY = 1024
+
+# Лимит: (запросов, за секунд); None - без ограничения
+Rate = Optional[Tuple[int, float]]
+
+
+def budget_for(style: str) -> str:
+    """Бюджет стиля"""
+    if style == 'ai':
+        return AI
+    if style == 'custom':
+        return CUSTOM
+    return CHEAP
+
+
+class TokenBucket:
+    """Бакет на capacity токенов, пополняется на rate токенов в секунду"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, capacity: int, per_seconds: float, now: float):
+        self.capacity = float(capacity)
+        self.rate = capacity / per_seconds
+        self.tokens = self.capacity
+        self.updated = now
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def retry_after(self, now: float) -> float:
+        """Через сколько секунд будет доступен токен (0 - доступен сейчас)"""
+        self.refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def full(self, now: float) -> bool:
+        self.refill(now)
+        return self.tokens >= self.capacity
+
+
+class RateLimiter:
+    """
+    Token bucket на пользователя и общий для каждого бюджета
+
+    Args:
+        user_limits: Бюджет -> (запросов, за секунд) на одного пользователя
+        global_limits: Бюджет -> (запросов, за секунд) на всех пользователей
+        clock: Источник времени (монотонный)
+    """
+
+    def __init__(self, user_limits: dict[str, Rate], global_limits: dict[str, Rate],
+                 clock: Callable[[], float] = time.monotonic):
+        self.user_limits = user_limits
+        self.clock = clock
+        now = clock()
+        self._global = {budget: TokenBucket(*limit, now)
+                        for budget, limit in global_limits.items() if limit}
+        self._users: dict[Tuple[str, int], TokenBucket] = {}
+        self._calls = 0
+        self.rejected = {f"{budget}_{scope}": 0 for budget in BUDGETS for scope in ("user", "global")}
+
+    def _user_bucket(self, budget: str, user_id: int, now: float) -> Optional[TokenBucket]:
+        limit = self.user_limits.get(budget)
+        if not limit:
+            return None
+        bucket = self._users.get((budget, user_id))
+        if bucket is None:
+            bucket = self._users[(budget, user_id)] = TokenBucket(*limit, now)
+        return bucket
+
+    def _prune(self, now: float) -> None:
+        # Полный бакет ничем не отличается от нового - удаляем
+        for key in [key for key, bucket in self._users.items() if bucket.full(now)]:
+            del self._users[key]
+
+    def peek(self, budget: str, user_id: int) -> float:
+        """Через сколько секунд запрос пройдет (0 - сейчас), без списания токена"""
+        now = self.clock()
+        buckets = [self._user_bucket(budget, user_id, now), self._global.get(budget)]
+        return max((bucket.retry_after(now) for bucket in buckets if bucket), default=0.0)
+
+    def acquire(self, budget: str, user_id: int) -> float:
+        """Списать токен; 0 - запрос допущен, иначе секунды до повтора"""
+        now = self.clock()
+        self._calls += 1
+        if self._calls % PRUNE_EVERY == 0:
+            self._prune(now)
+
+        user_bucket = self._user_bucket(budget, user_id, now)
+        global_bucket = self._global.get(budget)
+        user_wait = user_bucket.retry_after(now) if user_bucket else 0.0
+        global_wait = global_bucket.retry_after(now) if global_bucket else 0.0
+        if user_wait or global_wait:
+            # Токен не списывается ни из одного бакета
+            self.rejected[f"{budget}_{'user' if user_wait >= global_wait else 'global'}"] += 1
+            return max(user_wait, global_wait)
+
+        for bucket in (user_bucket, global_bucket):
+            if bucket:
+                bucket.tokens -= 1
+        return 0.0
+
+    def stats(self) -> dict:
+        """Отказы по бюджетам и число отслеживаемых бакетов пользователей"""
+        return {**self.rejected, "tracked_users": len(self._users)}
+
+
+def format_retry_after(seconds: float) -> str:
+    """Время до повтора для сообщения пользователю"""
+    seconds = max(1, int(seconds + 0.999))
+    if seconds < 60:
+        return f"{seconds} с"
+    minutes, seconds = divmod(seconds, 60)
+    return f"{minutes} мин {seconds} с" if seconds else f"{minutes} мин"
@@ -0,0 +1,53 @@
+"""Пул воркеров для рендера: CPU-работа не блокирует event loop бота"""
+
+import asyncio
+import functools
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+from generator import jobs, stages
+from generator.image_generator import ImageGenerator
+
+from . import metrics
+
+
+class RenderPool:
+    """
+    Обертка над ThreadPoolExecutor / ProcessPoolExecutor для async-обработчиков
+
+    thread  - воркеры разделяют генератор бота; OpenCV и PIL отпускают GIL
+              на тяжелых операциях (resize, кодирование)
+    process - у каждого воркера свой генератор; полная изоляция CPU
+    """
+
+    KINDS = ("thread", "process")
+
+    def __init__(self, generator: ImageGenerator, kind: str = "thread", workers: int = 2):
+        if kind not in self.KINDS:
+            raise ValueError(f"Неизвестный тип пула рендера: {kind}")
+        self.kind = kind
+        self.workers = workers
+        self._executor: Executor
+
+        if kind == "process":
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=jobs.init_worker,
+                initargs=(generator.fonts_dir, generator.encoder),
+            )
+        else:
+            jobs.set_generator(generator)
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Выполнить func(*args, **kwargs) в пуле и дождаться результата"""
+        loop = asyncio.get_running_loop()
+        # Стадии рендера собираются в воркере и попадают в метрики здесь,
+        # с метками текущего запроса
+        result, timings = await loop.run_in_executor(
+            self._executor, functools.partial(stages.call_with_stages, func, *args, **kwargs))
+        metrics.observe_stages(timings)
+        return result
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
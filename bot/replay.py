@@ -0,0 +1,113 @@
+"""Отправка записанных обновлений Telegram на webhook бота (локальная проверка)
+
+Вход - JSON-файл с одним обновлением, массивом обновлений или JSONL
+(по обновлению на строку), например ответ getUpdates, сохраненный до
+включения webhook:
+
+    curl https://api.telegram.org/bot<TOKEN>/getUpdates | jq .result > updates.json
+
+Запуск из корня проекта (бот запущен с BOT_MODE=webhook):
+
+    python -m bot.replay updates.json
+    python -m bot.replay updates.jsonl --url http://127.0.0.1:8443/telegram -c 8 -n 10
+
+Адрес и секрет по умолчанию берутся из WEBHOOK_PORT, WEBHOOK_PATH и
+WEBHOOK_SECRET (.env). Обновления отправляются с заголовком
+X-Telegram-Bot-Api-Secret-Token, как это делает Telegram; для проверки
+отказа можно передать --secret с неверным значением (ожидается 403).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from collections import Counter
+from typing import Optional
+
+import httpx
+from dotenv import load_dotenv
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+def load_updates(path: str) -> list[dict]:
+    """Обновления из JSON (объект или массив) или JSONL"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = [json.loads(line) for line in text.splitlines() if line.strip()]
+    if isinstance(data, dict):
+        # Ответ getUpdates целиком: {"ok": true, "result": [...]}
+        data = data.get("result", [data])
+    return data
+
+
+async def replay(updates: list[dict], url: str, secret: str, concurrency: int,
+                 repeat: int, timeout: float) -> tuple[Counter, list[float]]:
+    """Отправить обновления repeat раз; вернуть (коды ответов, задержки в секундах)"""
+    statuses: Counter = Counter()
+    latencies: list[float] = []
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    headers = {SECRET_HEADER: secret} if secret else {}
+
+    async def post(client: httpx.AsyncClient, update: dict) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.post(url, json=update, headers=headers)
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+                return
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] += 1
+
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        # Обновления отправляются по порядку, параллельно - не больше concurrency
+        await asyncio.gather(*(post(client, update)
+                               for _ in range(repeat) for update in updates))
+    return statuses, latencies
+
+
+def main(argv: Optional[list] = None) -> int:
+    load_dotenv()
+    default_url = (f"http://127.0.0.1:{os.getenv('WEBHOOK_PORT', '8443')}/"
+                   f"{os.getenv('WEBHOOK_PATH', 'telegram').strip('/')}")
+
+    parser = argparse.ArgumentParser(prog="python -m bot.replay",
+                                     description="Отправить записанные обновления на webhook бота")
+    parser.add_argument("input", help="JSON или JSONL с обновлениями")
+    parser.add_argument("--url", default=default_url, help=f"адрес webhook (по умолчанию {default_url})")
+    parser.add_argument("--secret", default=os.getenv('WEBHOOK_SECRET', ''),
+                        help="secret token (по умолчанию WEBHOOK_SECRET)")
+    parser.add_argument("-c", "--concurrency", type=int, default=1,
+                        help="одновременных запросов (1 - строго по порядку)")
+    parser.add_argument("-n", "--repeat", type=int, default=1, help="повторить набор N раз")
+    parser.add_argument("--timeout", type=float, default=30.0, help="таймаут запроса, секунды")
+    args = parser.parse_args(argv)
+
+    updates = load_updates(args.input)
+    if not updates:
+        print("Нет обновлений для отправки", file=sys.stderr)
+        return 1
+
+    started = time.perf_counter()
+    statuses, latencies = asyncio.run(replay(updates, args.url, args.secret, args.concurrency,
+                                             args.repeat, args.timeout))
+    elapsed = time.perf_counter() - started
+
+    print(f"Отправлено: {sum(statuses.values())} за {elapsed:.2f} с -> {args.url}")
+    print("Ответы: " + ", ".join(f"{status}: {count}" for status, count in statuses.most_common()))
+    if latencies:
+        latencies.sort()
+        print(f"Задержка: медиана {statistics.median(latencies) * 1000:.1f} мс, "
+              f"p90 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.9))] * 1000:.1f} мс")
+    return 0 if set(statuses) == {200} else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
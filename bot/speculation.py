@@ -0,0 +1,165 @@
+"""Упреждающий AI-запрос: генерация начинается сразу после ввода заголовка
+
+Промпт строится по заголовку, поэтому запрос можно отправить, пока
+пользователь пишет описание. Когда приходит задача AI-генерации:
+  - описание пропущено - используется упреждающий результат (hit);
+  - описание введено - решает политика:
+      reuse   - всегда использовать результат по заголовку (reused);
+      restart - отменить и сгенерировать заново с описанием (restarted);
+      auto    - использовать, если запрос уже завершен или идет дольше
+                reuse_after секунд (ожидание нового было бы дольше),
+                иначе перезапустить.
+Запросы, результат которых не понадобился (другой заголовок, /cancel,
+смена стиля, отказ по лимиту), отменяются и считаются abandoned.
+
+Упреждающий запрос - такой же платный вызов API, как задача очереди:
+при старте списывается токен AI-бюджета (RateLimiter), а пока запрос к
+API идет, он занимает бронь в лимитах AIJobQueue (на пользователя и
+общем). Токен оплачивает AI-превью по этому заголовку: и при hit/reused,
+и при restarted повторно он не списывается.
+"""
+
+import asyncio
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+from . import metrics
+from .ai_queue import AIJobQueue, QueueFullError
+from .rate_limit import AI as AI_BUDGET, RateLimiter
+
+REUSE = "reuse"
+RESTART = "restart"
+AUTO = "auto"
+POLICIES = (REUSE, RESTART, AUTO)
+
+# Исходы упреждающего запроса (метка result метрики)
+HIT = "hit"
+REUSED = "reused"
+RESTARTED = "restarted"
+ABANDONED = "abandoned"
+
+
+class Speculation:
+    """Упреждающий запрос одного пользователя"""
+
+    def __init__(self, title: str, task: asyncio.Task):
+        self.title = title
+        self.task = task
+        self.started = time.monotonic()
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.started
+
+
+class SpeculativeAI:
+    """
+    Упреждающие AI-запросы по пользователям
+
+    Args:
+        generator: AIImageGenerator
+        queue: Очередь AI-задач, в лимитах которой бронируется место
+        limiter: Ограничение частоты, из AI-бюджета которого списывается токен
+        policy: reuse, restart или auto (см. описание модуля)
+        reuse_after: Для auto - сколько секунд должен идти запрос, чтобы его не перезапускать
+        max_age: Запросы старше (пользователь ушел из диалога) отменяются при следующем запуске
+    """
+
+    def __init__(self, generator, queue: Optional[AIJobQueue] = None,
+                 limiter: Optional[RateLimiter] = None, policy: str = AUTO,
+                 reuse_after: float = 10.0, max_age: float = 600.0):
+        if policy not in POLICIES:
+            raise ValueError(f"Неизвестная политика упреждающего запроса: {policy}")
+        self.generator = generator
+        self.queue = queue
+        self.limiter = limiter
+        self.policy = policy
+        self.reuse_after = reuse_after
+        self.max_age = max_age
+        self._pending: dict[int, Speculation] = {}
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _finish(self, user_id: int, speculation: Speculation, result: str) -> None:
+        if result in (RESTARTED, ABANDONED):
+            speculation.task.cancel()
+            if self.queue is not None:
+                self.queue.release(user_id, speculation)
+        metrics.SPECULATION.inc(result=result)
+
+    def _admits(self, user_id: int) -> bool:
+        """Есть ли место в очереди и токен в AI-бюджете (без списания)"""
+        if self.queue is not None:
+            try:
+                self.queue.check(user_id)
+            except QueueFullError:
+                return False
+        return self.limiter is None or not self.limiter.peek(AI_BUDGET, user_id)
+
+    def start(self, user_id: int, title: str) -> bool:
+        """
+        Начать генерацию по заголовку; False - не начата (нет места или токена)
+
+        Предыдущий запрос пользователя отменяется.
+        """
+        self.discard(user_id)
+        for stale_id in [uid for uid, item in self._pending.items() if item.age > self.max_age]:
+            self._finish(stale_id, self._pending.pop(stale_id), ABANDONED)
+        if not self._admits(user_id):
+            return False
+        if self.limiter is not None:
+            self.limiter.acquire(AI_BUDGET, user_id)
+
+        prompt = self.generator.create_prompt_from_title(title)
+        # Стадии AI HTTP / decode упреждающего запроса относятся к стилю ai
+        with metrics.stage_style('ai'):
+            task = asyncio.create_task(self.generator.generate_illustration(prompt))
+        speculation = Speculation(title, task)
+        if self.queue is not None:
+            self.queue.reserve(user_id, speculation)
+            # Бронь нужна, пока идет запрос к API; готовый результат места не занимает
+            task.add_done_callback(lambda t: self.queue.release(user_id, speculation))
+        # Исход задачи забирается в take(); отмененные и брошенные не должны шуметь в логе
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        self._pending[user_id] = speculation
+        metrics.SPECULATION.inc(result="started")
+        return True
+
+    def discard(self, user_id: int) -> None:
+        """Упреждающий результат не понадобится - отменить запрос"""
+        speculation = self._pending.pop(user_id, None)
+        if speculation is not None:
+            self._finish(user_id, speculation, ABANDONED)
+
+    def take(self, user_id: int, title: str, description: Optional[str]
+             ) -> Tuple[Optional["asyncio.Task[Optional[np.ndarray]]"], bool]:
+        """
+        Упреждающий результат для AI-задачи: (задача или None, оплачено)
+
+        Задача None - нужно генерировать заново. Оплачено - токен за AI-превью
+        по этому заголовку уже списан при старте запроса (hit, reused и
+        restarted), повторно списывать не нужно.
+        """
+        speculation = self._pending.pop(user_id, None)
+        if speculation is None:
+            return None, False
+        if speculation.title != title:
+            self._finish(user_id, speculation, ABANDONED)
+            return None, False
+        if not description:
+            self._finish(user_id, speculation, HIT)
+            return speculation.task, True
+
+        reuse = self.policy == REUSE or (
+            self.policy == AUTO
+            and (speculation.task.done() or speculation.age >= self.reuse_after))
+        if reuse:
+            self._finish(user_id, speculation, REUSED)
+            return speculation.task, True
+        # Новый запрос с описанием оплачивается токеном отмененного
+        self._finish(user_id, speculation, RESTARTED)
+        return None, True
@@ -0,0 +1,131 @@
+"""Параллельная обработка обновлений с сохранением порядка для каждого пользователя"""
+
+import asyncio
+import logging
+from typing import Awaitable, Optional
+
+from telegram import Update
+from telegram.error import TelegramError
+from telegram.ext import BaseUpdateProcessor
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Во сколько раз число принятых обновлений может превышать число выполняемых
+PENDING_FACTOR = 4
+
+# Ответ на отброшенное обновление (один раз, пока очередь пользователя не разберется)
+DROPPED_TEXT = ("⏳ Слишком много сообщений подряд - часть из них не обработана. "
+                "Дождись ответа на предыдущие и отправь последнее сообщение еще раз.")
+
+
+def update_key(update: object) -> Optional[int]:
+    """Ключ сериализации: пользователь, а без него - чат (None - без ограничений)"""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_user is not None:
+        return update.effective_user.id
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    return None
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """
+    Обновления разных пользователей обрабатываются параллельно (не больше
+    max_concurrent_updates одновременно), обновления одного пользователя -
+    строго по очереди в порядке поступления. Так переходы состояний
+    ConversationHandler не перемешиваются, а медленный пользователь (AI,
+    загрузка фона) не задерживает остальных.
+
+    Application ограничивает число принятых обновлений семафором базового
+    класса (max_pending). Обновление, ждущее предыдущее обновление того же
+    пользователя, не занимает слот выполнения: слоты выдаются только после
+    блокировки пользователя.
+
+    Ожидающие обновления занимают места max_pending, поэтому у одного
+    пользователя их не больше max_per_user: лишние (пользователь шлет
+    сообщения быстрее, чем они обрабатываются) отбрасываются сразу и не
+    вытесняют обновления остальных. Чтобы ввод диалога (заголовок, фото)
+    не пропал незаметно, пользователь один раз получает ответ DROPPED_TEXT.
+    """
+
+    def __init__(self, max_concurrent_updates: int, max_pending: Optional[int] = None,
+                 max_per_user: int = 4):
+        max_concurrent_updates = max(1, max_concurrent_updates)
+        # Базовый класс допускает параллельность только при лимите больше 1
+        super().__init__(max(2, max_pending or max_concurrent_updates * PENDING_FACTOR))
+        self.max_running = max_concurrent_updates
+        self.max_per_user = max(1, max_per_user)
+        self._slots = asyncio.BoundedSemaphore(max_concurrent_updates)
+        # Ключ -> [блокировка, число обновлений пользователя в работе и в ожидании,
+        #         пользователь уже предупрежден об отброшенных обновлениях]
+        self._locks: dict[int, list] = {}
+        self.accepted = 0
+        self.running = 0
+
+    @property
+    def waiting(self) -> int:
+        """Принятые обновления, которые еще не начали выполняться"""
+        return self.accepted - self.running
+
+    async def _run(self, coroutine: Awaitable) -> None:
+        async with self._slots:
+            self.running += 1
+            try:
+                await coroutine
+            finally:
+                self.running -= 1
+
+    async def do_process_update(self, update: object, coroutine: Awaitable) -> None:
+        key = update_key(update)
+        if key is None:
+            self.accepted += 1
+            try:
+                await self._run(coroutine)
+            finally:
+                self.accepted -= 1
+            return
+
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0, False]
+        if entry[1] >= self.max_per_user:
+            coroutine.close()
+            metrics.UPDATES_DROPPED.inc()
+            if not entry[2]:
+                entry[2] = True
+                logger.warning("Пользователь %s: больше %d обновлений в очереди, "
+                               "обновления отбрасываются", key, self.max_per_user)
+                await self._notify_dropped(update)
+            return
+
+        entry[1] += 1
+        self.accepted += 1
+        try:
+            # asyncio.Lock выдается в порядке ожидания - порядок обновлений сохраняется
+            async with entry[0]:
+                await self._run(coroutine)
+        finally:
+            self.accepted -= 1
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
+
+    @staticmethod
+    async def _notify_dropped(update: Update) -> None:
+        """Сообщить пользователю, что его сообщение не обработано"""
+        message = update.effective_message
+        if message is None:
+            return
+        try:
+            await message.reply_text(DROPPED_TEXT)
+        except TelegramError:
+            pass
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
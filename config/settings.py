@@ -1,12 +1,28 @@
 """Настройки приложения"""
 
 import os
+import re
 from dotenv import load_dotenv
 
 # Загружаем переменные окружения из .env
 load_dotenv()
 
 
+def _rate(name: str, default: str):
+    """Лимит вида "запросов/секунд" (например, 3/300); пустое значение или 0 - без лимита"""
+    value = os.getenv(name, default).strip()
+    if not value or value == '0':
+        return None
+    try:
+        count, seconds = value.split('/')
+        count, seconds = int(count), float(seconds)
+    except ValueError:
+        raise ValueError(f"{name} должен иметь вид запросов/секунд, а не {value}") from None
+    if count <= 0 or seconds <= 0:
+        raise ValueError(f"{name}: число запросов и период должны быть больше нуля")
+    return count, seconds
+
+
 class Settings:
     """Настройки приложения"""
 
@@ -14,24 +30,134 @@ class Settings:
         # Telegram Bot
         self.telegram_bot_token = os.getenv('TELEGRAM_BOT_TOKEN', '')
 
+        # Получение обновлений: polling или webhook (встроенный HTTP-сервер).
+        # В режиме webhook Telegram шлет обновления на WEBHOOK_URL/WEBHOOK_PATH,
+        # сервер слушает WEBHOOK_LISTEN:WEBHOOK_PORT (за балансировщиком/прокси)
+        # и принимает только запросы с заголовком X-Telegram-Bot-Api-Secret-Token
+        self.bot_mode = os.getenv('BOT_MODE', 'polling').lower()
+        self.webhook_url = os.getenv('WEBHOOK_URL', '').rstrip('/')
+        self.webhook_listen = os.getenv('WEBHOOK_LISTEN', '0.0.0.0')
+        self.webhook_port = int(os.getenv('WEBHOOK_PORT', '8443'))
+        self.webhook_path = os.getenv('WEBHOOK_PATH', 'telegram').strip('/')
+        self.webhook_secret = os.getenv('WEBHOOK_SECRET', '')
+        self.webhook_max_connections = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))
+        # Сколько обновлений обрабатывается одновременно (обновления одного
+        # пользователя всегда по очереди)
+        self.update_concurrency = int(os.getenv('UPDATE_CONCURRENCY', '16'))
+        # Сколько обновлений одного пользователя может ждать очереди (лишние отбрасываются)
+        self.update_user_queue = int(os.getenv('UPDATE_USER_QUEUE', '4'))
+
         # vsellm.ru API (опционально)
         self.vsellm_api_key = os.getenv('VSELLM_API_KEY')
         self.vsellm_api_url = os.getenv('VSELLM_API_URL', 'https://api.vsellm.ru/v1')
+        # Таймауты (секунды), лимит одновременных генераций и размер пула соединений
+        self.ai_connect_timeout = float(os.getenv('AI_CONNECT_TIMEOUT', '10'))
+        self.ai_read_timeout = float(os.getenv('AI_READ_TIMEOUT', '180'))
+        self.ai_max_concurrency = int(os.getenv('AI_MAX_CONCURRENCY', '2'))
+        self.ai_max_connections = int(os.getenv('AI_MAX_CONNECTIONS', '10'))
+        # Повторы при временных ошибках (попытки, задержки в секундах) и circuit breaker:
+        # после AI_BREAKER_THRESHOLD отказов подряд API отключается на AI_BREAKER_RESET секунд
+        self.ai_retry_attempts = int(os.getenv('AI_RETRY_ATTEMPTS', '3'))
+        self.ai_retry_base_delay = float(os.getenv('AI_RETRY_BASE_DELAY', '1'))
+        self.ai_retry_max_delay = float(os.getenv('AI_RETRY_MAX_DELAY', '10'))
+        self.ai_breaker_threshold = int(os.getenv('AI_BREAKER_THRESHOLD', '3'))
+        self.ai_breaker_reset = float(os.getenv('AI_BREAKER_RESET', '60'))
+
+        # Фоновая очередь AI-генераций: воркеры, общий лимит, лимит на пользователя,
+        # период обновления статуса (секунды)
+        self.ai_queue_workers = int(os.getenv('AI_QUEUE_WORKERS', str(self.ai_max_concurrency)))
+        self.ai_queue_size = int(os.getenv('AI_QUEUE_SIZE', '20'))
+        self.ai_queue_per_user = int(os.getenv('AI_QUEUE_PER_USER', '1'))
+        self.ai_progress_interval = float(os.getenv('AI_PROGRESS_INTERVAL', '5'))
+
+        # Правила подсказок стиля мема (JSON); пустое значение - встроенные правила
+        self.meme_hints_path = os.getenv('MEME_HINTS_PATH', '')
+
+        # Упреждающий AI-запрос после ввода заголовка (0/1). Если затем введено описание,
+        # политика решает: reuse - использовать, restart - перезапустить с описанием,
+        # auto - использовать, если запрос идет дольше SPECULATIVE_AI_REUSE_AFTER секунд
+        self.speculative_ai = os.getenv('SPECULATIVE_AI', '0') == '1'
+        self.speculative_ai_policy = os.getenv('SPECULATIVE_AI_POLICY', 'auto')
+        self.speculative_ai_reuse_after = float(os.getenv('SPECULATIVE_AI_REUSE_AFTER', '10'))
+
+        # Кэш AI-иллюстраций (AI_CACHE_DIR= пустое значение отключает дисковый уровень,
+        # AI_CACHE_TTL=0 отключает кэш полностью)
+        self.ai_cache_memory_items = int(os.getenv('AI_CACHE_MEMORY_ITEMS', '32'))
+        self.ai_cache_memory_mb = int(os.getenv('AI_CACHE_MEMORY_MB', '256'))
+        self.ai_cache_dir = os.getenv('AI_CACHE_DIR', './cache/ai')
+        self.ai_cache_disk_mb = int(os.getenv('AI_CACHE_DISK_MB', '1024'))
+        self.ai_cache_ttl = int(os.getenv('AI_CACHE_TTL', str(24 * 3600)))
 
         # Image settings
         self.default_image_width = int(os.getenv('DEFAULT_IMAGE_WIDTH', '1280'))
         self.default_image_height = int(os.getenv('DEFAULT_IMAGE_HEIGHT', '640'))
         self.image_format = os.getenv('IMAGE_FORMAT', 'PNG')
         self.image_quality = int(os.getenv('IMAGE_QUALITY', '95'))
+        # Уровень сжатия PNG 0-9 (меньше - быстрее кодирование, больше файл)
+        self.png_compress_level = int(os.getenv('PNG_COMPRESS_LEVEL', '6'))
+        # Переопределение формата для отдельных стилей: IMAGE_FORMAT_AI=JPEG и т.п.
+        self.image_format_overrides = {
+            style: os.getenv(f'IMAGE_FORMAT_{style.upper()}')
+            for style in ('minimal', 'gradient', 'ai', 'custom')
+            if os.getenv(f'IMAGE_FORMAT_{style.upper()}')
+        }
 
         # Paths
         self.fonts_dir = os.getenv('FONTS_DIR', './assets/fonts')
         self.backgrounds_dir = os.getenv('BACKGROUNDS_DIR', './assets/backgrounds')
         self.temp_dir = os.getenv('TEMP_DIR', './temp')
 
+        # Пул рендера: thread или process, число воркеров
+        self.render_pool = os.getenv('RENDER_POOL', 'thread')
+        self.render_workers = int(os.getenv('RENDER_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+        # Кэш готовых превью (RENDER_CACHE_DIR= пустое значение отключает дисковый уровень)
+        self.render_cache_memory_items = int(os.getenv('RENDER_CACHE_MEMORY_ITEMS', '256'))
+        self.render_cache_memory_mb = int(os.getenv('RENDER_CACHE_MEMORY_MB', '64'))
+        self.render_cache_dir = os.getenv('RENDER_CACHE_DIR', './cache/renders')
+        self.render_cache_disk_mb = int(os.getenv('RENDER_CACHE_DISK_MB', '512'))
+
+        # file_id отправленных превью (FILE_ID_CACHE_DIR= пустое значение - только в памяти)
+        self.file_id_cache_items = int(os.getenv('FILE_ID_CACHE_ITEMS', '10000'))
+        self.file_id_cache_dir = os.getenv('FILE_ID_CACHE_DIR', './cache/file_ids')
+
+        # Состояние диалогов и user_data: файл SQLite или redis://... (PERSISTENCE_PATH= пустое
+        # значение - только в памяти); изменения сохраняются пакетом раз в PERSISTENCE_INTERVAL
+        # секунд. PERSISTENCE_SHARED=1 - несколько экземпляров бота с общим хранилищем:
+        # состояние пользователя перечитывается перед каждым обновлением и пишется сразу после
+        self.persistence_path = os.getenv('PERSISTENCE_PATH', './data/bot_state.sqlite3')
+        self.persistence_interval = float(os.getenv('PERSISTENCE_INTERVAL', '5'))
+        self.persistence_shared = os.getenv('PERSISTENCE_SHARED', '0') == '1'
+
+        # Ограничение частоты превью (запросов/секунд) на пользователя и на всех,
+        # отдельно для AI, своего фона и дешевых стилей (минимализм, градиент)
+        self.rate_limits_user = {
+            'ai': _rate('RATE_LIMIT_AI', '3/300'),
+            'custom': _rate('RATE_LIMIT_CUSTOM', '10/60'),
+            'cheap': _rate('RATE_LIMIT_CHEAP', '30/60'),
+        }
+        self.rate_limits_global = {
+            'ai': _rate('RATE_LIMIT_AI_GLOBAL', '30/60'),
+            'custom': _rate('RATE_LIMIT_CUSTOM_GLOBAL', '120/60'),
+            'cheap': _rate('RATE_LIMIT_CHEAP_GLOBAL', '600/60'),
+        }
+
+        # Метрики Prometheus на http://METRICS_HOST:METRICS_PORT/metrics (0 - выключены)
+        self.metrics_host = os.getenv('METRICS_HOST', '127.0.0.1')
+        self.metrics_port = int(os.getenv('METRICS_PORT', '9108'))
+
         # Валидация обязательных полей
         if not self.telegram_bot_token:
             raise ValueError("TELEGRAM_BOT_TOKEN не установлен в .env файле!")
+        if self.bot_mode not in ('polling', 'webhook'):
+            raise ValueError(f"BOT_MODE должен быть polling или webhook, а не {self.bot_mode}")
+        if self.bot_mode == 'webhook':
+            if not self.webhook_url:
+                raise ValueError("Для BOT_MODE=webhook нужен WEBHOOK_URL")
+            # Ограничения Telegram для secret_token: 1-256 символов A-Z, a-z, 0-9, _ и -
+            if not re.fullmatch(r'[A-Za-z0-9_-]{1,256}', self.webhook_secret):
+                raise ValueError("Для BOT_MODE=webhook нужен WEBHOOK_SECRET "
+                                 "(1-256 символов: латиница, цифры, _ и -)")
 
 
 # Глобальный экземпляр настроек
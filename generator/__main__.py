@@ -0,0 +1,8 @@
+"""Пакетный рендер: python -m generator jobs.jsonl -o output/"""
+
+import sys
+
+from .bulk import main
+
+if __name__ == '__main__':
+    sys.exit(main())
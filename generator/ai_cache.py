@@ -0,0 +1,182 @@
+"""Кэш AI-иллюстраций с объединением одинаковых одновременных запросов"""
+
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .render_cache import RenderCache
+from .resize import decode_cover
+
+
+def prompt_key(prompt: str, model: str) -> str:
+    """Ключ кэша - хэш модели и промпта"""
+    payload = f"{model}\n{prompt}".encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+
+class AIImageCache:
+    """
+    Кэш декодированных AI-иллюстраций
+
+    Память - LRU декодированных массивов (ограничен числом и объемом).
+    Диск - исходные байты изображения от API (RenderCache без памяти),
+    декодируются при попадании. Обе части учитывают ttl.
+
+    get_or_create объединяет одновременные запросы с одинаковым ключом:
+    к API уходит один запрос, все ожидающие получают один и тот же массив.
+    Запрос отменяется, только когда отменены все ожидающие.
+    Массивы из кэша только для чтения (flags.writeable = False).
+    """
+
+    def __init__(self, memory_items: int = 32, memory_bytes: int = 256 * 1024 * 1024,
+                 disk_dir: Optional[str] = None, disk_bytes: int = 1024 * 1024 * 1024,
+                 ttl: Optional[float] = 24 * 3600,
+                 decode_size: Optional[Tuple[int, int]] = None):
+        self.memory_items = memory_items
+        self.memory_bytes = memory_bytes
+        self.ttl = ttl
+        # Размер холста для декодирования с диска в уменьшенном разрешении
+        self.decode_size = decode_size
+        self.disk = RenderCache(memory_items=0, memory_bytes=0, disk_dir=disk_dir,
+                                disk_bytes=disk_bytes, ttl=ttl) if disk_dir else None
+
+        self._memory: "OrderedDict[str, Tuple[np.ndarray, float]]" = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._waiters: dict[str, int] = {}
+
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _get_memory(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return None
+            image, created = entry
+            if self.ttl is not None and time.time() - created > self.ttl:
+                del self._memory[key]
+                self._memory_size -= image.nbytes
+                return None
+            self._memory.move_to_end(key)
+            return image
+
+    def _put_memory(self, key: str, image: np.ndarray) -> None:
+        if image.nbytes > self.memory_bytes:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_size -= old[0].nbytes
+            self._memory[key] = (image, time.time())
+            self._memory_size += image.nbytes
+            while self._memory and (len(self._memory) > self.memory_items
+                                    or self._memory_size > self.memory_bytes):
+                _, (evicted, _) = self._memory.popitem(last=False)
+                self._memory_size -= evicted.nbytes
+
+    def _load_disk(self, key: str) -> Optional[np.ndarray]:
+        """Прочитать и декодировать изображение с диска (выполняется в потоке)"""
+        if self.disk is None:
+            return None
+        data = self.disk.get(key)
+        if data is None:
+            return None
+        if self.decode_size is not None:
+            return decode_cover(data, *self.decode_size)
+        return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    async def get(self, key: str) -> Optional[np.ndarray]:
+        """Найти изображение в памяти или на диске"""
+        image = self._get_memory(key)
+        if image is not None:
+            self.hits_memory += 1
+            return image
+
+        image = await asyncio.to_thread(self._load_disk, key)
+        if image is not None:
+            image.flags.writeable = False
+            self._put_memory(key, image)
+            self.hits_disk += 1
+            return image
+        return None
+
+    def put(self, key: str, image: np.ndarray, encoded: Optional[bytes] = None) -> None:
+        """Сохранить декодированное изображение (и исходные байты на диск)"""
+        image.flags.writeable = False
+        self._put_memory(key, image)
+        if self.disk is not None and encoded is not None:
+            self.disk.put(key, encoded)
+
+    async def get_or_create(
+        self, key: str,
+        factory: Callable[[], Awaitable[Optional[Tuple[np.ndarray, bytes]]]],
+    ) -> Optional[np.ndarray]:
+        """
+        Вернуть изображение из кэша или создать через factory
+
+        factory возвращает (изображение, исходные байты) или None при ошибке;
+        ошибки не кэшируются. Одновременные вызовы с одним ключом ждут
+        один и тот же запрос.
+        """
+        image = await self.get(key)
+        if image is not None:
+            return image
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._create(key, factory))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+
+        # shield - отмена одного ожидающего не отменяет запрос для остальных
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # Отменен последний ожидающий - запрос больше никому не нужен
+            if self._waiters[key] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+    async def _create(self, key: str, factory) -> Optional[np.ndarray]:
+        result = await factory()
+        if result is None:
+            return None
+        image, encoded = result
+        await asyncio.to_thread(self.put, key, image, encoded)
+        return image
+
+    def stats(self) -> dict:
+        """Счетчики попаданий/промахов и объединенных запросов"""
+        with self._lock:
+            stats = {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "inflight": len(self._inflight),
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_size,
+            }
+        if self.disk is not None:
+            disk_stats = self.disk.stats()
+            stats["disk_items"] = disk_stats["disk_items"]
+            stats["disk_bytes"] = disk_stats["disk_bytes"]
+        return stats
@@ -1,17 +1,55 @@
 """AI-генерация изображений через vsellm.ru API"""
 
-import base64
-import requests
+import asyncio
+import logging
+import httpx
 import cv2
 import numpy as np
-from typing import Optional
-from io import BytesIO
+from typing import Optional, Tuple
 
+from .ai_cache import AIImageCache, prompt_key
+from .ai_response import ImagePayloadParser
+from .meme_hints import DEFAULT_RULES_PATH, load_classifier
+from .resize import decode_cover
+from .stages import AI_DECODE, AI_HTTP, stage
+from .resilience import CircuitBreaker, retry_async
+
+logger = logging.getLogger(__name__)
+
+# Ответы провайдера, после которых имеет смысл повторить запрос
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+
+def _is_transient(error: BaseException) -> bool:
+    """Временная ошибка: запрос можно повторить"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRY_STATUS_CODES
+    # Таймаут чтения не повторяем: генерация уже заняла весь read_timeout
+    if isinstance(error, httpx.ReadTimeout):
+        return False
+    return isinstance(error, httpx.TransportError)
+
+
+def _is_provider_failure(error: BaseException) -> bool:
+    """Отказ провайдера (учитывается circuit breaker'ом)"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, httpx.TransportError)
 
-class AIImageGenerator:
-    """Генератор изображений через vsellm.ru API"""
 
-    def __init__(self, api_key: str, api_url: str = "https://api.vsellm.ru/v1"):
+class AIImageGenerator:
+    """Генератор изображений через vsellm.ru API (async, пул соединений)"""
+
+    def __init__(self, api_key: str, api_url: str = "https://api.vsellm.ru/v1",
+                 connect_timeout: float = 10.0, read_timeout: float = 180.0,
+                 max_concurrency: int = 2, max_connections: int = 10,
+                 cache: Optional[AIImageCache] = None,
+                 retry_attempts: int = 3, retry_base_delay: float = 1.0,
+                 retry_max_delay: float = 10.0, breaker_threshold: int = 3,
+                 breaker_reset: float = 60.0,
+                 decode_size: Optional[Tuple[int, int]] = None,
+                 hints_path: Optional[str] = None):
         self.api_key = api_key
         self.api_url = api_url
         # Используем google/gemini-2.5-flash-image - проверенная рабочая модель
@@ -19,7 +57,56 @@ class AIImageGenerator:
         self.model = "google/gemini-3-pro-image-preview"
         # self.model = "gemini-3-pro-image"
 
-    def generate_illustration(self, prompt: str, size: str = "1024x1024") -> Optional[np.ndarray]:
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=60.0,
+        )
+        # Ограничение числа одновременных генераций (квота и нагрузка на API)
+        self.max_concurrency = max_concurrency
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+        # Кэш иллюстраций по (промпт, модель); None - без кэша
+        self.cache = cache
+
+        # Повторы при временных ошибках и отключение API после серии отказов
+        self.retry_attempts = retry_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.breaker = CircuitBreaker("vsellm", breaker_threshold, breaker_reset)
+
+        # Правила подсказок стиля мема (None - встроенный файл правил)
+        self.hints = load_classifier(hints_path or DEFAULT_RULES_PATH)
+        # Размер холста (ширина, высота): изображения намного больше него
+        # декодируются в уменьшенном разрешении; None - всегда полное
+        self.decode_size = decode_size
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Постоянная сессия с keep-alive (создается при первом запросе)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.api_url,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json"
+                },
+                timeout=self.timeout,
+                limits=self.limits,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        """Закрыть пул соединений (при остановке бота)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def available(self) -> bool:
+        """API доступен (circuit breaker не разомкнут)"""
+        return not self.breaker.is_open()
+
+    async def generate_illustration(self, prompt: str, size: str = "1024x1024") -> Optional[np.ndarray]:
         """
         Генерация AI-иллюстрации
 
@@ -29,16 +116,27 @@ class AIImageGenerator:
                   Примечание: Gemini модели могут не поддерживать все размеры
 
         Returns:
-            OpenCV numpy array или None в случае ошибки
+            OpenCV numpy array или None в случае ошибки.
+            При включенном кэше массив общий для всех запросов и только для чтения
         """
-        try:
-            # vsellm.ru использует chat/completions для генерации изображений
-            response = requests.post(
-                f"{self.api_url}/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
+        if self.cache is None:
+            result = await self._generate(prompt)
+            return result[0] if result is not None else None
+
+        # Одинаковые промпты берутся из кэша, одновременные - объединяются в один запрос
+        return await self.cache.get_or_create(
+            prompt_key(prompt, self.model),
+            lambda: self._generate(prompt),
+        )
+
+    async def _request(self, prompt: str) -> ImagePayloadParser:
+        """Один запрос к API (под семафором); бросает httpx-исключения"""
+        async with self._semaphore:
+            # vsellm.ru использует chat/completions для генерации изображений.
+            # Тело читается потоком: base64 картинки декодируется по мере поступления
+            async with self._get_client().stream(
+                "POST",
+                "/chat/completions",
                 json={
                     "model": self.model,
                     "messages": [
@@ -49,55 +147,77 @@ class AIImageGenerator:
                     ],
                     "max_tokens": 4096
                 },
-                timeout=180
-            )
-
-            response.raise_for_status()
-            data = response.json()
-
-            # Извлекаем base64 изображение из ответа
-            choices = data.get('choices', [])
-            if not choices:
-                print("Ошибка: пустой ответ от API")
-                return None
-
-            message = choices[0].get('message', {})
-            images = message.get('images', [])
-
-            if not images:
-                print("Ошибка: изображение не сгенерировано")
-                return None
-
-            # Получаем data URL
-            image_data_url = images[0].get('image_url', {}).get('url', '')
-
-            if not image_data_url.startswith('data:image'):
-                print("Ошибка: неверный формат изображения")
-                return None
-
-            # Извлекаем base64 данные
-            # Формат: data:image/png;base64,<base64_data>
-            base64_data = image_data_url.split(',', 1)[1]
-
-            # Декодируем base64
-            image_bytes = base64.b64decode(base64_data)
-
-            # Конвертируем в OpenCV image (numpy array)
-            image_array = np.frombuffer(image_bytes, dtype=np.uint8)
-            image = cv2.imdecode(image_array, cv2.IMREAD_COLOR)
-
-            return image
+            ) as response:
+                response.raise_for_status()
+                parser = ImagePayloadParser(int(response.headers.get("content-length", 0)))
+                # Ответ дочитывается до конца (после картинки feed ничего не делает),
+                # чтобы соединение вернулось в пул keep-alive
+                async for chunk in response.aiter_bytes():
+                    parser.feed(chunk)
+                return parser
+
+    async def _generate(self, prompt: str) -> Optional[Tuple[np.ndarray, memoryview]]:
+        """Запрос к API с повторами; возвращает (изображение, исходные байты) или None"""
+        if not self.breaker.allow_request():
+            logger.warning("AI API недоступен (circuit breaker разомкнут), запрос пропущен")
+            return None
 
-        except requests.exceptions.Timeout:
-            print("Ошибка: таймаут при генерации изображения")
+        try:
+            with stage(AI_HTTP):
+                parser = await retry_async(
+                    lambda: self._request(prompt),
+                    attempts=self.retry_attempts,
+                    base_delay=self.retry_base_delay,
+                    max_delay=self.retry_max_delay,
+                    retry_if=_is_transient,
+                )
+        except asyncio.CancelledError:
+            # Отмена (упреждающий запрос, /cancel, остановка) - не успех и не отказ
+            self.breaker.release_probe()
+            raise
+        except httpx.HTTPError as e:
+            if _is_provider_failure(e):
+                self.breaker.record_failure()
+            else:
+                # Ошибка запроса (4xx) - провайдер отвечает, breaker не трогаем
+                self.breaker.record_success()
+            if isinstance(e, httpx.TimeoutException):
+                logger.error("Таймаут при генерации AI-изображения")
+            else:
+                logger.error("Ошибка HTTP при генерации AI-изображения: %s", e)
             return None
-        except requests.exceptions.RequestException as e:
-            print(f"Ошибка HTTP при генерации AI-изображения: {e}")
+        except Exception as e:
+            self.breaker.record_success()
+            logger.error("Ошибка при генерации AI-изображения: %s", e)
             return None
+
+        self.breaker.record_success()
+        try:
+            # imdecode - CPU-работа, выполняем вне event loop
+            with stage(AI_DECODE):
+                return await asyncio.to_thread(self._decode_image, parser)
         except Exception as e:
-            print(f"Ошибка при генерации AI-изображения: {e}")
+            logger.error("Ошибка при декодировании AI-изображения: %s", e)
+            return None
+
+    def _decode_image(self, parser: ImagePayloadParser) -> Optional[Tuple[np.ndarray, memoryview]]:
+        """Декодировать изображение прямо из буфера парсера"""
+        image_bytes = parser.result()
+        if image_bytes is None:
+            logger.error("Ошибка: %s", parser.error)
             return None
 
+        # np.frombuffer не копирует буфер
+        if self.decode_size is not None:
+            image = decode_cover(image_bytes, *self.decode_size)
+        else:
+            image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            logger.error("Ошибка: не удалось декодировать изображение")
+            return None
+
+        return image, image_bytes
+
     def create_prompt_from_title(self, title: str, description: str = None) -> str:
         """
         Создать промпт для AI-генерации на основе заголовка и описания
@@ -160,29 +280,5 @@ class AIImageGenerator:
         Returns:
             Подсказка для стиля мема
         """
-        text = (title + " " + (description or "")).lower()
-
-        # Определяем тип эмоции/ситуации
-        if any(word in text for word in ["не получается", "провал", "ошибка", "упала", "падает", "кризис"]):
-            return "Suggested meme style: Disappointed/frustrated reaction. Think: facepalm, head in hands, 'why me' expression."
-
-        elif any(word in text for word in ["успех", "получилось", "победа", "рост", "выиграл"]):
-            return "Suggested meme style: Victory/celebration reaction. Think: triumphant pose, happy dance, 'yes!' moment."
-
-        elif any(word in text for word in ["удивительно", "неожиданно", "шок", "wow", "офигеть"]):
-            return "Suggested meme style: Shocked/surprised reaction. Think: wide eyes, dropped jaw, pointing at something."
-
-        elif any(word in text for word in ["думаю", "размышление", "вопрос", "как", "почему"]):
-            return "Suggested meme style: Thinking/confused reaction. Think: scratching head, looking puzzled, contemplating."
-
-        elif any(word in text for word in ["работа", "офис", "начальник", "коллеги", "совещание"]):
-            return "Suggested meme style: Office/work situation. Think: office worker's relatable moment, meeting scene, desk drama."
-
-        elif any(word in text for word in ["деньги", "продаж", "клиент", "бизнес", "прибыль"]):
-            return "Suggested meme style: Money/business related. Think: counting money, empty wallet, negotiation scene."
-
-        elif any(word in text for word in ["учимся", "обучение", "новое", "не знал", "узнал"]):
-            return "Suggested meme style: Learning/discovery moment. Think: 'aha!' moment, mind blown, taking notes intensely."
-
-        else:
-            return "Suggested meme style: Universal relatable reaction. Make it expressive and dramatic."
+        # Категории, слова и подсказки - в файле правил (generator/data/meme_hints.json)
+        return self.hints.hint(title + " " + (description or ""))
@@ -0,0 +1,135 @@
+"""Потоковое извлечение изображения из ответа chat/completions
+
+Ответ vsellm содержит картинку как data URL внутри JSON:
+    {"choices": [{"message": {"images": [{"image_url": {"url": "data:image/png;base64,..."}}]}}]}
+
+Вместо response.json() + split + b64decode парсер читает тело по кускам,
+находит первое значение "url" внутри "image_url" и декодирует base64 по
+мере поступления в один заранее выделенный буфер. Весь документ целиком
+в памяти не собирается, а буфер отдается в cv2.imdecode без копирования.
+"""
+
+import binascii
+import re
+from typing import Optional
+
+# Ключ объекта с картинкой; в экранированном тексте сообщения (\"image_url\")
+# за именем идет обратный слэш, поэтому такие вхождения не совпадают
+IMAGE_URL_KEY = b'"image_url"'
+URL_VALUE = re.compile(rb'"url"\s*:\s*"')
+# "/" в JSON может быть экранирован: data:image\/png;base64,
+DATA_URL_PREFIX = re.compile(rb'data:image\\?/[\w.+-]+;base64,')
+
+# Сколько байт хвоста хранить между кусками при поиске ключей
+SEARCH_TAIL = 64
+# Лимит на префикс data URL до запятой
+PREFIX_LIMIT = 128
+
+
+class ImagePayloadParser:
+    """
+    Инкрементальный парсер base64-картинки из JSON-ответа
+
+    feed(chunk) - очередной кусок тела ответа, result() - декодированные
+    байты изображения (memoryview на внутренний буфер) или None; причина
+    неудачи - в self.error.
+    """
+
+    SEARCH_KEY, SEARCH_URL, PREFIX, PAYLOAD, DONE = range(5)
+
+    def __init__(self, size_hint: int = 0):
+        """
+        Args:
+            size_hint: Ожидаемый размер тела ответа (Content-Length);
+                       буфер сразу выделяется под base64 такого размера
+        """
+        self.state = self.SEARCH_KEY
+        self.error: Optional[str] = None
+        self._pending = b""
+        # Декодированные байты пишутся в buffer[:size]
+        self._buffer = bytearray(size_hint * 3 // 4 + 3 if size_hint > 0 else 0)
+        self._size = 0
+
+    def _write(self, decoded: bytes) -> None:
+        end = self._size + len(decoded)
+        if end > len(self._buffer):
+            # Без Content-Length (или при сжатии) буфер растет удвоением
+            self._buffer.extend(bytes(max(end, 2 * len(self._buffer)) - len(self._buffer)))
+        self._buffer[self._size:end] = decoded
+        self._size = end
+
+    def _feed_payload(self, data: bytes) -> None:
+        """base64 до закрывающей кавычки; декодируются только полные четверки"""
+        end = data.find(b'"')
+        if end >= 0:
+            self.state = self.DONE
+            data = data[:end]
+
+        if b'\\' in data:
+            # JSON допускает экранирование "/" и переносы строк внутри base64
+            if self.state != self.DONE and data.endswith(b'\\'):
+                self._pending = b'\\'
+                data = data[:-1]
+            data = data.replace(b'\\/', b'/').replace(b'\\n', b'').replace(b'\\r', b'')
+
+        if self.state == self.DONE:
+            tail = len(data)
+        else:
+            tail = len(data) - len(data) % 4
+            self._pending = data[tail:] + self._pending
+        if tail:
+            try:
+                self._write(binascii.a2b_base64(data[:tail]))
+            except binascii.Error as e:
+                self.error = f"неверные base64-данные: {e}"
+                self.state = self.DONE
+
+    def feed(self, chunk: bytes) -> None:
+        """Обработать очередной кусок тела ответа"""
+        if self.state == self.DONE:
+            return
+        data = self._pending + chunk if self._pending else chunk
+        self._pending = b""
+
+        while data and self.state != self.DONE:
+            if self.state == self.SEARCH_KEY:
+                index = data.find(IMAGE_URL_KEY)
+                if index < 0:
+                    self._pending = data[-SEARCH_TAIL:]
+                    return
+                data = data[index + len(IMAGE_URL_KEY):]
+                self.state = self.SEARCH_URL
+
+            elif self.state == self.SEARCH_URL:
+                match = URL_VALUE.search(data)
+                if match is None:
+                    self._pending = data[-SEARCH_TAIL:]
+                    return
+                data = data[match.end():]
+                self.state = self.PREFIX
+
+            elif self.state == self.PREFIX:
+                match = DATA_URL_PREFIX.match(data)
+                if match is None:
+                    if len(data) < PREFIX_LIMIT and b'"' not in data:
+                        self._pending = data
+                        return
+                    self.error = "неверный формат изображения"
+                    self.state = self.DONE
+                    return
+                data = data[match.end():]
+                self.state = self.PAYLOAD
+
+            else:
+                self._feed_payload(data)
+                return
+
+    def result(self) -> Optional[memoryview]:
+        """Декодированное изображение или None (см. self.error)"""
+        if self.error is None and self.state != self.DONE:
+            self.error = ("изображение не сгенерировано" if self.state <= self.SEARCH_URL
+                          else "ответ оборвался")
+        if self.error is not None or self._size == 0:
+            self.error = self.error or "пустое изображение"
+            return None
+        return memoryview(self._buffer)[:self._size]
@@ -0,0 +1,210 @@
+"""Пакетный рендер превью из JSONL (без Telegram-бота)
+
+Каждая строка входа - JSON-объект задания:
+    {"id": "post-42", "style": "gradient", "title": "...", "description": "...",
+     "gradient": "ocean", "background": "path/to/bg.jpg"}
+
+Обязательно только поле title. style - minimal, gradient (по умолчанию)
+или custom (фон из background; без него - градиент). Имя результата -
+id (или номер строки) + расширение формата.
+
+Задания читаются потоком и раздаются пулу процессов окном ограниченного
+размера: в работе одновременно не больше window заданий, поэтому память
+не растет на входах любого размера. Воркер сам пишет файл и возвращает
+только его размер.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Iterator, Optional, TextIO, Tuple
+
+from . import jobs
+from .encoder import SUPPORTED_FORMATS, ImageEncoder
+
+STYLES = ("minimal", "gradient", "custom")
+EXTENSIONS = {"PNG": ".png", "JPEG": ".jpg", "WEBP": ".webp"}
+
+# Символы, допустимые в имени файла результата
+UNSAFE_NAME = re.compile(r'[^\w.-]+')
+
+
+class JobError(ValueError):
+    """Некорректное задание (ошибка в строке входа)"""
+
+
+def parse_job(line: str, line_no: int) -> dict:
+    """Разобрать и проверить строку задания"""
+    try:
+        spec = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise JobError(f"неверный JSON: {e}") from None
+    if not isinstance(spec, dict):
+        raise JobError("задание должно быть JSON-объектом")
+    if not spec.get("title"):
+        raise JobError("не задан title")
+    style = spec.get("style", "gradient")
+    if style not in STYLES:
+        raise JobError(f"неподдерживаемый стиль: {style}")
+
+    name = UNSAFE_NAME.sub("_", str(spec.get("id", line_no))).strip("._")
+    return {
+        "name": name or str(line_no),
+        "style": style,
+        "title": str(spec["title"]),
+        "description": spec.get("description"),
+        "gradient": spec.get("gradient", "ocean"),
+        "background": spec.get("background"),
+    }
+
+
+def render_job(job: dict, path: str) -> int:
+    """Отрендерить задание в файл (выполняется в процессе-воркере); возвращает размер"""
+    if job["style"] == "custom" and job["background"] and not os.path.exists(job["background"]):
+        raise FileNotFoundError(f"фон не найден: {job['background']}")
+    data = jobs.render(job["style"], job["title"], job["description"],
+                       job["gradient"], background_path=job["background"])
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return len(data)
+
+
+def read_lines(stream: TextIO) -> Iterator[Tuple[int, str]]:
+    """Непустые строки входа с номерами (поток, без чтения файла целиком)"""
+    for line_no, line in enumerate(stream, start=1):
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line_no, line
+
+
+class Stats:
+    """Счетчики прогресса пакетного рендера"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.done = 0
+        self.skipped = 0
+        self.failed = 0
+        self.bytes = 0
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def summary(self) -> str:
+        rate = self.done / self.elapsed if self.elapsed > 0 else 0.0
+        return (f"готово {self.done}, пропущено {self.skipped}, ошибок {self.failed}, "
+                f"{self.bytes / 1024 / 1024:.1f} МБ за {self.elapsed:.1f} с ({rate:.1f} превью/с)")
+
+
+def run(stream: TextIO, output_dir: str, workers: int, window: int,
+        encoder: ImageEncoder, fonts_dir: str, skip_existing: bool = False,
+        errors: Optional[TextIO] = None, report_interval: float = 5.0) -> Stats:
+    """
+    Отрендерить все задания из потока в output_dir
+
+    Ошибки не прерывают обработку: каждая пишется в stderr и, если задан
+    errors, строкой JSON {"line", "id", "error"}.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    extension = EXTENSIONS[encoder.format_for()]
+    stats = Stats()
+    pending: dict[Future, Tuple[int, str]] = {}
+    last_report = time.perf_counter()
+
+    def fail(line_no: int, name: Optional[str], error: str) -> None:
+        stats.failed += 1
+        print(f"[ERROR] строка {line_no}: {error}", file=sys.stderr)
+        if errors is not None:
+            errors.write(json.dumps({"line": line_no, "id": name, "error": error},
+                                    ensure_ascii=False) + "\n")
+
+    def collect(block: bool) -> None:
+        nonlocal last_report
+        if not pending:
+            return
+        done, _ = wait(pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        for future in done:
+            line_no, name = pending.pop(future)
+            try:
+                stats.bytes += future.result()
+                stats.done += 1
+            except Exception as e:
+                fail(line_no, name, str(e) or type(e).__name__)
+
+        now = time.perf_counter()
+        if now - last_report >= report_interval:
+            last_report = now
+            print(f"[INFO] {stats.summary()}", file=sys.stderr)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=jobs.init_worker,
+                             initargs=(fonts_dir, encoder)) as pool:
+        for line_no, line in read_lines(stream):
+            try:
+                job = parse_job(line, line_no)
+            except JobError as e:
+                fail(line_no, None, str(e))
+                continue
+
+            path = os.path.join(output_dir, job["name"] + extension)
+            if skip_existing and os.path.exists(path):
+                stats.skipped += 1
+                continue
+
+            # Окно заполнено - ждем завершения хотя бы одного задания
+            while len(pending) >= window:
+                collect(block=True)
+            pending[pool.submit(render_job, job, path)] = (line_no, job["name"])
+            collect(block=False)
+
+        while pending:
+            collect(block=True)
+
+    return stats
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m generator",
+        description="Пакетный рендер превью из JSONL-файла или stdin",
+    )
+    parser.add_argument("input", nargs="?", default="-",
+                        help="JSONL с заданиями (по умолчанию stdin)")
+    parser.add_argument("-o", "--output", default="./output", help="директория для результатов")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="число процессов (по умолчанию - все ядра)")
+    parser.add_argument("--window", type=int, default=0,
+                        help="максимум заданий в работе (по умолчанию workers * 4)")
+    parser.add_argument("--format", default="PNG", choices=SUPPORTED_FORMATS + ("JPG",),
+                        type=str.upper, help="формат результата")
+    parser.add_argument("--quality", type=int, default=95, help="качество JPEG/WebP")
+    parser.add_argument("--png-compress-level", type=int, default=6, help="сжатие PNG 0-9")
+    parser.add_argument("--fonts-dir", default="./assets/fonts", help="директория шрифтов")
+    parser.add_argument("--skip-existing", action="store_true",
+                        help="не перерисовывать уже существующие файлы")
+    parser.add_argument("--errors", help="записывать ошибки в JSONL-файл")
+    args = parser.parse_args(argv)
+
+    encoder = ImageEncoder(args.format, args.quality, args.png_compress_level)
+    workers = max(1, args.workers)
+    window = args.window if args.window > 0 else workers * 4
+
+    stream = sys.stdin if args.input == "-" else open(args.input, encoding='utf-8')
+    errors = open(args.errors, 'w', encoding='utf-8') if args.errors else None
+    try:
+        stats = run(stream, args.output, workers, window, encoder, args.fonts_dir,
+                    skip_existing=args.skip_existing, errors=errors)
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if errors is not None:
+            errors.close()
+
+    print(f"[INFO] {stats.summary()}", file=sys.stderr)
+    return 1 if stats.failed else 0
@@ -0,0 +1,101 @@
+"""Кодирование готового превью (PNG / JPEG / WebP)"""
+
+from io import BytesIO
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from .stages import ENCODE, stage
+
+
+SUPPORTED_FORMATS = ("PNG", "JPEG", "WEBP")
+
+# Синонимы, которые можно встретить в .env
+FORMAT_ALIASES = {
+    "JPG": "JPEG",
+}
+
+
+def normalize_format(image_format: str) -> str:
+    """Привести название формата к виду PIL и проверить поддержку"""
+    fmt = image_format.strip().upper()
+    fmt = FORMAT_ALIASES.get(fmt, fmt)
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"Неподдерживаемый формат изображения: {image_format}")
+    return fmt
+
+
+class ImageEncoder:
+    """
+    Общая стадия кодирования для всех стилей
+
+    Формат и качество берутся из настроек (IMAGE_FORMAT / IMAGE_QUALITY)
+    и могут быть переопределены для отдельного стиля, например
+    JPEG для фотографичных AI-превью и PNG для плоских градиентов.
+    """
+
+    def __init__(self, image_format: str = "PNG", quality: int = 95,
+                 png_compress_level: int = 6, webp_method: int = 4,
+                 style_formats: Optional[dict[str, str]] = None):
+        self.image_format = normalize_format(image_format)
+        self.quality = quality
+        self.png_compress_level = png_compress_level
+        self.webp_method = webp_method
+        self.style_formats = {
+            style: normalize_format(fmt) for style, fmt in (style_formats or {}).items()
+        }
+
+    def format_for(self, style: Optional[str] = None) -> str:
+        """Формат для стиля (с учетом переопределений)"""
+        return self.style_formats.get(style, self.image_format)
+
+    def signature(self, style: Optional[str] = None) -> Tuple:
+        """Параметры кодирования для стиля (входят в ключ кэша готовых превью)"""
+        fmt = self.format_for(style)
+        if fmt == "PNG":
+            return fmt, self.png_compress_level
+        if fmt == "WEBP":
+            return fmt, self.quality, self.webp_method
+        return fmt, self.quality
+
+    def save_options(self, style: Optional[str] = None) -> dict:
+        """Аргументы для Image.save"""
+        fmt = self.format_for(style)
+        if fmt == "PNG":
+            return {"format": fmt, "compress_level": self.png_compress_level}
+        if fmt == "WEBP":
+            return {"format": fmt, "quality": self.quality, "method": self.webp_method}
+        return {"format": fmt, "quality": self.quality}
+
+    def imencode_params(self, style: Optional[str] = None) -> Tuple[str, list[int]]:
+        """Расширение и параметры для cv2.imencode (PNG и JPEG)"""
+        fmt = self.format_for(style)
+        if fmt == "PNG":
+            return ".png", [cv2.IMWRITE_PNG_COMPRESSION, self.png_compress_level]
+        return ".jpg", [cv2.IMWRITE_JPEG_QUALITY, self.quality]
+
+    def encode_bgr(self, cv_img: np.ndarray, style: Optional[str] = None) -> BytesIO:
+        """
+        Закодировать BGR-массив OpenCV напрямую, без конвертации в PIL
+
+        WebP кодируется через PIL: в cv2.imencode нет аналога параметра
+        method, а результат должен совпадать с PIL-стилями и signature().
+        """
+        if self.format_for(style) == "WEBP":
+            return self.encode(Image.fromarray(cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)), style)
+        ext, params = self.imencode_params(style)
+        with stage(ENCODE):
+            ok, buffer = cv2.imencode(ext, cv_img, params)
+        if not ok:
+            raise ValueError(f"Не удалось закодировать изображение в {ext}")
+        return BytesIO(buffer)
+
+    def encode(self, pil_img: Image.Image, style: Optional[str] = None) -> BytesIO:
+        """Закодировать изображение в BytesIO (позиция в начале)"""
+        output = BytesIO()
+        with stage(ENCODE):
+            pil_img.save(output, **self.save_options(style))
+        output.seek(0)
+        return output
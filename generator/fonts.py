@@ -0,0 +1,96 @@
+"""Реестр шрифтов PIL: цепочка fallback резолвится один раз, шрифты кэшируются"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple
+
+from PIL import ImageFont
+
+from .stages import FONT_LOAD, stage
+
+
+# Цепочка fallback (по весу): файл из fonts_dir -> системные шрифты
+FONT_FILES = {
+    True: "Arial-Bold.ttf",
+    False: "Arial.ttf",
+}
+SYSTEM_FONTS = {
+    # Windows, затем Linux (DejaVu есть почти везде и поддерживает кириллицу)
+    True: ("arialbd.ttf", "DejaVuSans-Bold.ttf"),
+    False: ("arial.ttf", "DejaVuSans.ttf"),
+}
+
+# Маркер "ни один файл не найден - используем дефолтный шрифт PIL"
+DEFAULT_FONT = ""
+
+
+class FontRegistry:
+    """Кэш загруженных FreeTypeFont по ключу (путь, размер, вес)"""
+
+    def __init__(self, fonts_dir: str = "./assets/fonts", max_fonts: int = 32):
+        self.fonts_dir = fonts_dir
+        self.max_fonts = max_fonts
+        self._paths: dict[bool, str] = {}
+        self._fonts: "OrderedDict[Tuple[str, int, bool], ImageFont.FreeTypeFont]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _candidates(self, bold: bool) -> list[str]:
+        """Кандидаты на файл шрифта в порядке приоритета"""
+        candidates = []
+        font_path = os.path.join(self.fonts_dir, FONT_FILES[bold])
+        if os.path.exists(font_path):
+            candidates.append(font_path)
+        candidates.extend(SYSTEM_FONTS[bold])
+        return candidates
+
+    def _load(self, path: str, size: int) -> ImageFont.FreeTypeFont:
+        if path == DEFAULT_FONT:
+            return ImageFont.load_default()
+        return ImageFont.truetype(path, size)
+
+    def _resolve(self, size: int, bold: bool) -> Tuple[str, ImageFont.FreeTypeFont]:
+        """Пройти цепочку fallback (один раз на вес) и загрузить шрифт"""
+        path = self._paths.get(bold)
+        if path is not None:
+            return path, self._load(path, size)
+
+        for candidate in self._candidates(bold):
+            try:
+                font = ImageFont.truetype(candidate, size)
+            except Exception:
+                continue
+            self._paths[bold] = candidate
+            return candidate, font
+
+        # Последний fallback - дефолтный шрифт
+        self._paths[bold] = DEFAULT_FONT
+        return DEFAULT_FONT, self._load(DEFAULT_FONT, size)
+
+    def get(self, size: int, bold: bool = False) -> ImageFont.FreeTypeFont:
+        """Получить шрифт (из кэша или с диска при первом обращении)"""
+        with self._lock:
+            path = self._paths.get(bold)
+            if path is not None:
+                key = (path, size, bold)
+                font = self._fonts.get(key)
+                if font is not None:
+                    self._fonts.move_to_end(key)
+                    return font
+
+            # Промах кэша - чтение файла шрифта с диска
+            with stage(FONT_LOAD):
+                path, font = self._resolve(size, bold)
+            self._fonts[(path, size, bold)] = font
+            while len(self._fonts) > self.max_fonts:
+                self._fonts.popitem(last=False)
+            return font
+
+    def prewarm(self, sizes: Iterable[Tuple[int, bool]]) -> None:
+        """Заранее загрузить шрифты нужных размеров (вызывается при старте)"""
+        for size, bold in sizes:
+            self.get(size, bold)
+
+    def resolved_path(self, bold: bool = False) -> Optional[str]:
+        """Путь к выбранному файлу шрифта (None - еще не резолвился, '' - дефолтный)"""
+        return self._paths.get(bold)
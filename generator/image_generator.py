@@ -1,4 +1,9 @@
-"""Гибридный генератор изображений: OpenCV для графики + PIL для текста с кириллицей"""
+"""Гибридный генератор изображений: OpenCV для графики + PIL для текста с кириллицей
+
+Каждый стиль работает с одним холстом в одном порядке каналов:
+стили с текстом - холст PIL (RGB), стили без текста - массив OpenCV (BGR),
+который кодируется напрямую. Промежуточные операции выполняются на месте.
+"""
 
 import os
 import cv2
@@ -6,89 +11,96 @@ import numpy as np
 from io import BytesIO
 from typing import Optional, Tuple
 from PIL import Image, ImageDraw, ImageFont
-from .templates import TemplateConfig, get_gradient_colors
+from .encoder import ImageEncoder
+from .fonts import FontRegistry
+from .gradients import create_gradient_image, create_linear_gradient
+from .layout import LayoutLine, TextLayout
+from .resize import decode_cover, read_cover, resize_cover
+from .stages import BACKGROUND, DRAW, LAYOUT, stage
+from .templates import TemplateConfig, get_gradient_spec
 
 
 class ImageGenerator:
     """Генератор превью-изображений (OpenCV + PIL)"""
 
-    def __init__(self, fonts_dir: str = "./assets/fonts"):
+    def __init__(self, fonts_dir: str = "./assets/fonts",
+                 encoder: Optional[ImageEncoder] = None):
         self.fonts_dir = fonts_dir
         self.width = TemplateConfig.WIDTH
         self.height = TemplateConfig.HEIGHT
+        self.fonts = FontRegistry(fonts_dir)
+        self.layout = TextLayout()
+        self.encoder = encoder or ImageEncoder()
 
     def _get_font(self, size: int, bold: bool = False) -> ImageFont.FreeTypeFont:
-        """Получить шрифт PIL для кириллицы"""
-        # Пытаемся загрузить пользовательский шрифт
-        font_name = "Arial-Bold.ttf" if bold else "Arial.ttf"
-        font_path = os.path.join(self.fonts_dir, font_name)
-
-        try:
-            if os.path.exists(font_path):
-                return ImageFont.truetype(font_path, size)
-        except Exception:
-            pass
-
-        # Fallback на системные шрифты Windows
-        try:
-            system_font = "arialbd.ttf" if bold else "arial.ttf"
-            return ImageFont.truetype(system_font, size)
-        except Exception:
-            pass
-
-        # Последний fallback - дефолтный шрифт
-        return ImageFont.load_default()
+        """Получить шрифт PIL для кириллицы (из кэша реестра)"""
+        return self.fonts.get(size, bold)
+
+    def prewarm_fonts(self) -> None:
+        """Загрузить все шрифты шаблонов заранее, чтобы рендер не ходил на диск"""
+        self.fonts.prewarm(TemplateConfig.FONTS)
 
     def _wrap_text(self, text: str, font: ImageFont.FreeTypeFont, max_width: int) -> list[str]:
         """Разбить текст на строки по ширине"""
-        words = text.split()
-        lines = []
-        current_line = []
-
-        for word in words:
-            test_line = ' '.join(current_line + [word])
-            bbox = font.getbbox(test_line)
-            width = bbox[2] - bbox[0]
-
-            if width <= max_width:
-                current_line.append(word)
-            else:
-                if current_line:
-                    lines.append(' '.join(current_line))
-                current_line = [word]
-
-        if current_line:
-            lines.append(' '.join(current_line))
-
-        return lines
+        with stage(LAYOUT):
+            return [line.text for line in self.layout.wrap(text, font, max_width)]
+
+    def _draw_lines(self, draw: ImageDraw.ImageDraw, lines: list[LayoutLine], x: int, y: int,
+                    font: ImageFont.FreeTypeFont, line_height: int,
+                    fill: Tuple[int, int, int],
+                    shadow_color: Optional[Tuple[int, int, int]] = None) -> int:
+        """Нарисовать строки из раскладки; возвращает y под последней строкой"""
+        with stage(DRAW):
+            for line in lines:
+                if shadow_color is not None:
+                    # Тень
+                    draw.text((x + 2, y + 2), line.text, font=font, fill=shadow_color)
+                draw.text((x, y), line.text, font=font, fill=fill)
+                y += line_height
+        return y
+
+    def _draw_text_block(self, draw: ImageDraw.ImageDraw, title: str, description: Optional[str],
+                         x: int, max_width: int, fill: Tuple[int, int, int],
+                         shadow_color: Optional[Tuple[int, int, int]] = None) -> None:
+        """Нарисовать заголовок и описание (общая часть всех стилей с текстом)"""
+        # Шрифты
+        title_font = self._get_font(TemplateConfig.TITLE_FONT_SIZE, bold=True)
+        desc_font = self._get_font(TemplateConfig.DESCRIPTION_FONT_SIZE, bold=False)
 
-    def _cv2_to_pil(self, cv_image: np.ndarray) -> Image.Image:
-        """Конвертировать OpenCV image (BGR) в PIL Image (RGB)"""
-        rgb_image = cv2.cvtColor(cv_image, cv2.COLOR_BGR2RGB)
-        return Image.fromarray(rgb_image)
+        # Рисуем заголовок
+        with stage(LAYOUT):
+            title_lines = self.layout.wrap(title, title_font, max_width)
+        y = self._draw_lines(draw, title_lines, x, TemplateConfig.TITLE_Y_POSITION,
+                             title_font, TemplateConfig.TITLE_FONT_SIZE + 10, fill, shadow_color)
 
-    def _pil_to_cv2(self, pil_image: Image.Image) -> np.ndarray:
-        """Конвертировать PIL Image (RGB) в OpenCV image (BGR)"""
-        rgb_array = np.array(pil_image)
-        return cv2.cvtColor(rgb_array, cv2.COLOR_RGB2BGR)
+        # Рисуем описание
+        if description:
+            y += 40
+            with stage(LAYOUT):
+                desc_lines = self.layout.wrap(description, desc_font, max_width)
+            self._draw_lines(draw, desc_lines, x, y, desc_font,
+                             TemplateConfig.DESCRIPTION_FONT_SIZE + 8, fill, shadow_color)
 
     def _create_gradient(self, start_color: Tuple[int, int, int],
                         end_color: Tuple[int, int, int]) -> np.ndarray:
-        """Создать вертикальный градиент с OpenCV"""
+        """Создать вертикальный градиент (BGR для OpenCV)"""
         # OpenCV использует BGR вместо RGB
         start_bgr = (start_color[2], start_color[1], start_color[0])
         end_bgr = (end_color[2], end_color[1], end_color[0])
 
-        img = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        return create_linear_gradient(self.width, self.height, start_bgr, end_bgr)
 
-        for y in range(self.height):
-            ratio = y / self.height
-            b = int(start_bgr[0] * (1 - ratio) + end_bgr[0] * ratio)
-            g = int(start_bgr[1] * (1 - ratio) + end_bgr[1] * ratio)
-            r = int(start_bgr[2] * (1 - ratio) + end_bgr[2] * ratio)
-            img[y, :] = [b, g, r]
+    def _create_gradient_canvas(self, gradient_type: str) -> Image.Image:
+        """Создать холст PIL (RGB) с градиентом по пресету из templates"""
+        kind, stops = get_gradient_spec(gradient_type)
+        with stage(BACKGROUND):
+            return create_gradient_image(self.width, self.height, stops, kind)
 
-        return img
+    def _apply_overlay(self, cv_img: np.ndarray) -> np.ndarray:
+        """Затемнить изображение на месте (overlay черным с OVERLAY_ALPHA)"""
+        alpha = TemplateConfig.OVERLAY_ALPHA / 255.0
+        # То же, что addWeighted с черным кадром, но без второго буфера
+        return cv2.convertScaleAbs(cv_img, dst=cv_img, alpha=1 - alpha)
 
     def generate_minimal(self, title: str, description: Optional[str] = None,
                         dark_mode: bool = False) -> BytesIO:
@@ -98,123 +110,40 @@ class ImageGenerator:
         text_color = TemplateConfig.MINIMAL_TEXT_DARK if dark_mode else TemplateConfig.MINIMAL_TEXT_LIGHT
         accent_color = TemplateConfig.MINIMAL_ACCENT
 
-        # Создаем изображение с OpenCV (BGR)
-        bg_bgr = (bg_color[2], bg_color[1], bg_color[0])
-        cv_img = np.full((self.height, self.width, 3), bg_bgr, dtype=np.uint8)
+        # Холст сразу в PIL (RGB) - единственный буфер кадра
+        pil_img = Image.new('RGB', (self.width, self.height), bg_color)
+        draw = ImageDraw.Draw(pil_img)
 
         # Акцентная линия слева
         line_width = 8
-        accent_bgr = (accent_color[2], accent_color[1], accent_color[0])
-        cv2.rectangle(cv_img, (0, 0), (line_width, self.height), accent_bgr, -1)
-
-        # Конвертируем в PIL для рисования текста
-        pil_img = self._cv2_to_pil(cv_img)
-        draw = ImageDraw.Draw(pil_img)
-
-        # Шрифты
-        title_font = self._get_font(TemplateConfig.TITLE_FONT_SIZE, bold=True)
-        desc_font = self._get_font(TemplateConfig.DESCRIPTION_FONT_SIZE, bold=False)
+        draw.rectangle((0, 0, line_width, self.height), fill=accent_color)
 
-        # Рисуем заголовок
+        # Рисуем заголовок и описание
         max_text_width = self.width - TemplateConfig.PADDING * 2 - line_width * 2
-        title_lines = self._wrap_text(title, title_font, max_text_width)
-
-        y = TemplateConfig.TITLE_Y_POSITION
-        for line in title_lines:
-            draw.text(
-                (TemplateConfig.PADDING + line_width * 2, y),
-                line,
-                font=title_font,
-                fill=text_color
-            )
-            y += TemplateConfig.TITLE_FONT_SIZE + 10
+        self._draw_text_block(draw, title, description, TemplateConfig.PADDING + line_width * 2,
+                              max_text_width, text_color)
 
-        # Рисуем описание
-        if description:
-            y += 40
-            desc_lines = self._wrap_text(description, desc_font, max_text_width)
-            for line in desc_lines:
-                draw.text(
-                    (TemplateConfig.PADDING + line_width * 2, y),
-                    line,
-                    font=desc_font,
-                    fill=text_color
-                )
-                y += TemplateConfig.DESCRIPTION_FONT_SIZE + 8
-
-        # Сохраняем в BytesIO
-        output = BytesIO()
-        pil_img.save(output, format='PNG')
-        output.seek(0)
-        return output
+        # Кодируем (формат и качество из настроек, с учетом стиля)
+        return self.encoder.encode(pil_img, style='minimal')
 
     def generate_gradient(self, title: str, description: Optional[str] = None,
                          gradient_type: str = "ocean") -> BytesIO:
         """Генерация превью с градиентом"""
-        # Получаем цвета градиента
-        start_color, end_color = get_gradient_colors(gradient_type)
-
-        # Создаем градиент с OpenCV
-        cv_img = self._create_gradient(start_color, end_color)
-
-        # Конвертируем в PIL для текста
-        pil_img = self._cv2_to_pil(cv_img)
+        # Создаем градиент по пресету (линейный, диагональный, радиальный или многоцветный)
+        # сразу как холст PIL в RGB
+        pil_img = self._create_gradient_canvas(gradient_type)
         draw = ImageDraw.Draw(pil_img)
 
-        # Шрифты
-        title_font = self._get_font(TemplateConfig.TITLE_FONT_SIZE, bold=True)
-        desc_font = self._get_font(TemplateConfig.DESCRIPTION_FONT_SIZE, bold=False)
         text_color = (255, 255, 255)
         shadow_color = (0, 0, 0)
 
-        # Рисуем заголовок с тенью
+        # Рисуем заголовок и описание с тенью
         max_text_width = self.width - TemplateConfig.PADDING * 2
-        title_lines = self._wrap_text(title, title_font, max_text_width)
-
-        y = TemplateConfig.TITLE_Y_POSITION
-        for line in title_lines:
-            # Тень
-            draw.text(
-                (TemplateConfig.PADDING + 2, y + 2),
-                line,
-                font=title_font,
-                fill=shadow_color
-            )
-            # Основной текст
-            draw.text(
-                (TemplateConfig.PADDING, y),
-                line,
-                font=title_font,
-                fill=text_color
-            )
-            y += TemplateConfig.TITLE_FONT_SIZE + 10
+        self._draw_text_block(draw, title, description, TemplateConfig.PADDING,
+                              max_text_width, text_color, shadow_color)
 
-        # Рисуем описание
-        if description:
-            y += 40
-            desc_lines = self._wrap_text(description, desc_font, max_text_width)
-            for line in desc_lines:
-                # Тень
-                draw.text(
-                    (TemplateConfig.PADDING + 2, y + 2),
-                    line,
-                    font=desc_font,
-                    fill=shadow_color
-                )
-                # Основной текст
-                draw.text(
-                    (TemplateConfig.PADDING, y),
-                    line,
-                    font=desc_font,
-                    fill=text_color
-                )
-                y += TemplateConfig.DESCRIPTION_FONT_SIZE + 8
-
-        # Сохраняем в BytesIO
-        output = BytesIO()
-        pil_img.save(output, format='PNG')
-        output.seek(0)
-        return output
+        # Кодируем (формат и качество из настроек, с учетом стиля)
+        return self.encoder.encode(pil_img, style='gradient')
 
     def generate_ai_only(self, ai_image: np.ndarray) -> BytesIO:
         """
@@ -225,114 +154,65 @@ class ImageGenerator:
             ai_image: AI-сгенерированное изображение (numpy array)
 
         Returns:
-            BytesIO с PNG изображением
+            BytesIO с закодированным изображением
         """
-        # Получаем размеры исходного изображения
-        img_height, img_width = ai_image.shape[:2]
-
-        # Вычисляем соотношения сторон
-        target_ratio = self.width / self.height  # 1280/640 = 2.0
-        img_ratio = img_width / img_height
-
-        # Масштабируем так, чтобы заполнить целевой размер
-        if img_ratio > target_ratio:
-            # Изображение шире целевого - масштабируем по высоте
-            new_height = self.height
-            new_width = int(img_width * (self.height / img_height))
-        else:
-            # Изображение уже или равно целевому - масштабируем по ширине
-            new_width = self.width
-            new_height = int(img_height * (self.width / img_width))
-
-        # Масштабируем изображение
-        resized = cv2.resize(ai_image, (new_width, new_height), interpolation=cv2.INTER_LANCZOS4)
-
-        # Обрезаем до нужного размера (центрируем)
-        if new_width > self.width:
-            # Обрезаем по ширине
-            x_offset = (new_width - self.width) // 2
-            cv_img = resized[:, x_offset:x_offset + self.width]
-        elif new_height > self.height:
-            # Обрезаем по высоте
-            y_offset = (new_height - self.height) // 2
-            cv_img = resized[y_offset:y_offset + self.height, :]
-        else:
-            cv_img = resized
-
-        # Конвертируем в PIL
-        pil_img = self._cv2_to_pil(cv_img)
+        # Вырезаем центральную область и масштабируем только ее (crop to fit)
+        with stage(BACKGROUND):
+            cv_img = resize_cover(ai_image, self.width, self.height)
 
-        # Сохраняем в BytesIO
-        output = BytesIO()
-        pil_img.save(output, format='PNG')
-        output.seek(0)
-        return output
+        # Кодируем прямо из BGR-массива OpenCV, без конвертации в PIL
+        return self.encoder.encode_bgr(cv_img, style='ai')
 
     def generate_with_background(self, title: str, description: Optional[str] = None,
                                  background_path: Optional[str] = None,
                                  background_image: Optional[np.ndarray] = None,
-                                 add_text: bool = True) -> BytesIO:
-        """Генерация превью с пользовательским фоном"""
-        # Загружаем фон
+                                 add_text: bool = True,
+                                 background_data: Optional[bytes] = None) -> BytesIO:
+        """
+        Генерация превью с пользовательским фоном (crop to fit)
+
+        Фон берется из первого заданного источника: background_image (BGR),
+        background_data (закодированные байты), background_path (файл).
+        """
+        # Загружаем фон (BGR); большие изображения декодируются сразу в уменьшенном разрешении
         if background_image is not None:
-            cv_img = background_image.copy()
+            cv_img = background_image
+        elif background_data:
+            with stage(BACKGROUND):
+                cv_img = decode_cover(background_data, self.width, self.height)
+            if cv_img is None:
+                return self.generate_gradient(title, description)
         elif background_path and os.path.exists(background_path):
-            cv_img = cv2.imread(background_path)
+            with stage(BACKGROUND):
+                cv_img = read_cover(background_path, self.width, self.height)
             if cv_img is None:
                 return self.generate_gradient(title, description)
         else:
             return self.generate_gradient(title, description)
 
-        # Масштабируем фон
-        cv_img = cv2.resize(cv_img, (self.width, self.height), interpolation=cv2.INTER_LANCZOS4)
-
-        # Конвертируем в PIL
-        pil_img = self._cv2_to_pil(cv_img)
-
-        # Добавляем текст только если нужно
-        if add_text:
-            # Добавляем полупрозрачный overlay для читаемости текста
-            overlay = np.zeros((self.height, self.width, 3), dtype=np.uint8)
-            alpha = TemplateConfig.OVERLAY_ALPHA / 255.0
-            cv_img = cv2.addWeighted(cv_img, 1 - alpha, overlay, alpha, 0)
-            pil_img = self._cv2_to_pil(cv_img)
-
-            draw = ImageDraw.Draw(pil_img)
-
-            # Шрифты
-            title_font = self._get_font(TemplateConfig.TITLE_FONT_SIZE, bold=True)
-            desc_font = self._get_font(TemplateConfig.DESCRIPTION_FONT_SIZE, bold=False)
-            text_color = (255, 255, 255)
-
-            # Рисуем заголовок
-            max_text_width = self.width - TemplateConfig.PADDING * 2
-            title_lines = self._wrap_text(title, title_font, max_text_width)
-
-            y = TemplateConfig.TITLE_Y_POSITION
-            for line in title_lines:
-                draw.text(
-                    (TemplateConfig.PADDING, y),
-                    line,
-                    font=title_font,
-                    fill=text_color
-                )
-                y += TemplateConfig.TITLE_FONT_SIZE + 10
-
-            # Рисуем описание
-            if description:
-                y += 40
-                desc_lines = self._wrap_text(description, desc_font, max_text_width)
-                for line in desc_lines:
-                    draw.text(
-                        (TemplateConfig.PADDING, y),
-                        line,
-                        font=desc_font,
-                        fill=text_color
-                    )
-                    y += TemplateConfig.DESCRIPTION_FONT_SIZE + 8
-
-        # Сохраняем в BytesIO
-        output = BytesIO()
-        pil_img.save(output, format='PNG')
-        output.seek(0)
-        return output
+        # Масштабируем фон без искажения пропорций (новый буфер - исходный
+        # массив вызывающего не меняется)
+        with stage(BACKGROUND):
+            cv_img = resize_cover(cv_img, self.width, self.height)
+
+        # Без текста - кодируем прямо из BGR-массива
+        if not add_text:
+            return self.encoder.encode_bgr(cv_img, style='custom')
+
+        # Добавляем полупрозрачный overlay для читаемости текста и переводим
+        # буфер в RGB - обе операции на месте
+        self._apply_overlay(cv_img)
+        cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB, dst=cv_img)
+
+        # Единственная копия кадра - передача буфера в PIL для текста
+        pil_img = Image.fromarray(cv_img)
+        draw = ImageDraw.Draw(pil_img)
+
+        # Рисуем заголовок и описание
+        text_color = (255, 255, 255)
+        max_text_width = self.width - TemplateConfig.PADDING * 2
+        self._draw_text_block(draw, title, description, TemplateConfig.PADDING,
+                              max_text_width, text_color)
+
+        # Кодируем (формат и качество из настроек, с учетом стиля)
+        return self.encoder.encode(pil_img, style='custom')
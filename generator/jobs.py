@@ -0,0 +1,54 @@
+"""Функции рендера для пула воркеров (потоки или процессы)
+
+Функции уровня модуля, чтобы их можно было передать в ProcessPoolExecutor.
+Каждый процесс-воркер создает свой ImageGenerator в init_worker; пул
+потоков разделяет один генератор, переданный через set_generator.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from .encoder import ImageEncoder
+from .image_generator import ImageGenerator
+
+_generator: Optional[ImageGenerator] = None
+
+
+def set_generator(generator: ImageGenerator) -> None:
+    """Использовать готовый генератор (пул потоков в том же процессе)"""
+    global _generator
+    _generator = generator
+
+
+def init_worker(fonts_dir: str, encoder: Optional[ImageEncoder] = None) -> None:
+    """Инициализатор процесса-воркера: свой генератор с прогретыми шрифтами"""
+    generator = ImageGenerator(fonts_dir, encoder=encoder)
+    generator.prewarm_fonts()
+    set_generator(generator)
+
+
+def get_generator() -> ImageGenerator:
+    if _generator is None:
+        raise RuntimeError("Генератор воркера не инициализирован")
+    return _generator
+
+
+def render(style: str, title: str, description: Optional[str] = None,
+           gradient_type: str = 'ocean', background_path: Optional[str] = None,
+           background_data: Optional[bytes] = None) -> bytes:
+    """Рендер стилей без AI; возвращает закодированное изображение"""
+    generator = get_generator()
+    if style == 'minimal':
+        image_bytes = generator.generate_minimal(title, description)
+    elif style == 'custom':
+        image_bytes = generator.generate_with_background(title, description, background_path,
+                                                         background_data=background_data)
+    else:
+        image_bytes = generator.generate_gradient(title, description, gradient_type)
+    return image_bytes.getvalue()
+
+
+def render_ai(ai_image: np.ndarray) -> bytes:
+    """Масштабирование и кодирование AI-иллюстрации"""
+    return get_generator().generate_ai_only(ai_image).getvalue()
@@ -0,0 +1,77 @@
+"""Раскладка текста по строкам с кэшем ширины слов"""
+
+import threading
+from typing import Hashable, NamedTuple, Tuple
+
+from PIL import ImageFont
+
+
+class LayoutLine(NamedTuple):
+    """Строка после переноса и ее ширина в пикселях"""
+    text: str
+    width: float
+
+
+def _font_key(font: ImageFont.FreeTypeFont) -> Tuple[Hashable, int]:
+    """Ключ шрифта для кэша (файл + размер)"""
+    return getattr(font, 'path', id(font)), getattr(font, 'size', 0)
+
+
+class TextLayout:
+    """
+    Перенос текста за линейное время
+
+    Ширина каждого уникального слова и пробела измеряется один раз
+    для каждого шрифта и переиспользуется между запросами. Ширина строки
+    считается как сумма ширин слов и пробелов между ними.
+    """
+
+    def __init__(self, max_words_per_font: int = 20000):
+        self.max_words_per_font = max_words_per_font
+        self._widths: dict[Tuple[Hashable, int], dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def _widths_for(self, font: ImageFont.FreeTypeFont) -> dict[str, float]:
+        key = _font_key(font)
+        widths = self._widths.get(key)
+        if widths is None:
+            with self._lock:
+                widths = self._widths.setdefault(key, {})
+        return widths
+
+    def measure(self, word: str, font: ImageFont.FreeTypeFont) -> float:
+        """Ширина слова (из кэша или через font.getlength)"""
+        widths = self._widths_for(font)
+        width = widths.get(word)
+        if width is None:
+            if len(widths) >= self.max_words_per_font:
+                # Простая защита от неограниченного роста кэша
+                widths.clear()
+            width = widths[word] = font.getlength(word)
+        return width
+
+    def wrap(self, text: str, font: ImageFont.FreeTypeFont, max_width: int) -> list[LayoutLine]:
+        """Разбить текст на строки по ширине; слово шире max_width занимает строку целиком"""
+        space = self.measure(' ', font)
+        lines = []
+        current_line = []
+        current_width = 0.0
+
+        for word in text.split():
+            width = self.measure(word, font)
+
+            if not current_line:
+                current_line.append(word)
+                current_width = width
+            elif current_width + space + width <= max_width:
+                current_line.append(word)
+                current_width += space + width
+            else:
+                lines.append(LayoutLine(' '.join(current_line), current_width))
+                current_line = [word]
+                current_width = width
+
+        if current_line:
+            lines.append(LayoutLine(' '.join(current_line), current_width))
+
+        return lines
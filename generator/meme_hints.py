@@ -0,0 +1,118 @@
+"""Подсказка стиля мема по тексту поста: правила из файла данных, один проход регулярки
+
+Правила (generator/data/meme_hints.json или свой файл) - категории в
+порядке приоритета, у каждой ключевые слова (подстроки текста в нижнем
+регистре) и подсказка для промпта. Побеждает первая по порядку категория,
+слово которой встречается в тексте; если совпадений нет - default.
+
+Все слова компилируются в одну регулярку: в каждой позиции, где
+начинается какое-либо слово, набор опережающих проверок (lookahead)
+отмечает все категории, слово которых начинается здесь. Lookahead не
+поглощает текст, поэтому перекрывающиеся слова разных категорий тоже
+находятся - результат совпадает с проверкой каждой подстроки отдельно.
+Слова собираются в префиксное дерево (общие префиксы проверяются один
+раз), проверки категорий идут от низшего приоритета к высшему, и
+match.lastindex сразу дает лучшую категорию в позиции.
+"""
+
+import json
+import os
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), "data", "meme_hints.json")
+
+
+def _trie_pattern(words) -> str:
+    """Регулярка для набора слов в виде префиксного дерева: кот|код -> ко(?:д|т)"""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Слово заканчивается здесь, но есть и более длинные продолжения
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class Category(NamedTuple):
+    name: str
+    keywords: tuple
+    hint: str
+
+
+class MemeHintClassifier:
+    """
+    Классификатор текста по категориям мемов
+
+    Args:
+        categories: Категории в порядке приоритета
+        default: Подсказка, если ни одна категория не подошла
+    """
+
+    def __init__(self, categories: list[Category], default: str):
+        self.categories = categories
+        self.default = default
+        for category in categories:
+            if not category.keywords or not all(category.keywords):
+                raise ValueError(f"Категория {category.name}: пустой список или пустое слово")
+
+        words = [word for category in categories for word in category.keywords]
+        # Группа k (с 1) - категория с приоритетом len - k: последняя совпавшая группа
+        # (lastindex) - лучшая категория в позиции
+        checks = "".join(f"(?:(?=({_trie_pattern(categories[index].keywords)})))?"
+                         for index in reversed(range(len(categories))))
+        self._pattern = re.compile(f"(?=(?:{_trie_pattern(words)})){checks}")
+
+    @classmethod
+    def from_file(cls, path: str = DEFAULT_RULES_PATH) -> "MemeHintClassifier":
+        """Загрузить правила из JSON: {"default": ..., "categories": [{name, keywords, hint}]}"""
+        with open(path, encoding='utf-8') as f:
+            rules = json.load(f)
+        categories = [
+            Category(item["name"], tuple(word.lower() for word in item["keywords"]), item["hint"])
+            for item in rules["categories"]
+        ]
+        return cls(categories, rules["default"])
+
+    def scores(self, text: str) -> dict[str, int]:
+        """Число вхождений слов каждой категории (за один проход)"""
+        total = len(self.categories)
+        counts = [0] * total
+        for match in self._pattern.finditer(text.lower()):
+            for group, value in enumerate(match.groups(), start=1):
+                if value is not None:
+                    counts[total - group] += 1
+        return {category.name: count for category, count in zip(self.categories, counts)}
+
+    def classify(self, text: str) -> Optional[Category]:
+        """Категория с наивысшим приоритетом среди найденных или None"""
+        total = len(self.categories)
+        best = total
+        for match in self._pattern.finditer(text.lower()):
+            index = total - match.lastindex
+            if index < best:
+                best = index
+                if best == 0:
+                    break
+        return self.categories[best] if best < total else None
+
+    def hint(self, text: str) -> str:
+        """Подсказка для промпта"""
+        category = self.classify(text)
+        return category.hint if category is not None else self.default
+
+
+@lru_cache(maxsize=None)
+def load_classifier(path: str = DEFAULT_RULES_PATH) -> MemeHintClassifier:
+    """Классификатор из файла (компилируется один раз на путь)"""
+    return MemeHintClassifier.from_file(path)
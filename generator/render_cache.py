@@ -0,0 +1,211 @@
+"""Кэш готовых превью: LRU в памяти + ограниченный по размеру кэш на диске"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from .templates import TEMPLATE_VERSION
+
+
+def render_key(style: str, title: str, description: Optional[str] = None,
+               gradient_type: Optional[str] = None, width: int = 0, height: int = 0,
+               **extra) -> str:
+    """
+    Ключ кэша - хэш всех параметров, влияющих на результат рендера
+
+    Args:
+        style: Стиль превью
+        title: Заголовок
+        description: Описание
+        gradient_type: Цветовая схема градиента
+        width: Ширина изображения
+        height: Высота изображения
+        **extra: Прочие параметры (например, хэш пользовательского фона)
+
+    Returns:
+        sha256 hex-строка
+    """
+    spec = {
+        "v": TEMPLATE_VERSION,
+        "style": style,
+        "title": title,
+        "description": description or "",
+        "gradient": gradient_type or "",
+        "size": [width, height],
+        "extra": extra,
+    }
+    payload = json.dumps(spec, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+
+class RenderCache:
+    """
+    Двухуровневый кэш закодированных изображений
+
+    Уровень 1 - LRU в памяти (ограничен числом записей и суммарным размером).
+    Уровень 2 - файлы на диске (ограничены суммарным размером, вытесняются
+    самые давние по последнему обращению). Попадание на диске поднимает
+    запись в память. Если задан ttl, записи старше ttl секунд (с момента
+    сохранения) считаются промахом и удаляются.
+    """
+
+    def __init__(self, memory_items: int = 256, memory_bytes: int = 64 * 1024 * 1024,
+                 disk_dir: Optional[str] = None, disk_bytes: int = 512 * 1024 * 1024,
+                 ttl: Optional[float] = None):
+        self.memory_items = memory_items
+        self.memory_bytes = memory_bytes
+        self.disk_dir = disk_dir or None
+        self.disk_bytes = disk_bytes
+        self.ttl = ttl
+
+        self._memory: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._memory_size = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_size = 0
+        self._lock = threading.Lock()
+
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.evictions_memory = 0
+        self.evictions_disk = 0
+        self.expired = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._load_disk_index()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.bin")
+
+    def _load_disk_index(self) -> None:
+        """Восстановить индекс дискового кэша (от старых обращений к новым)"""
+        entries = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.is_file() and entry.name.endswith('.bin'):
+                stat = entry.stat()
+                entries.append((stat.st_atime, entry.name[:-4], stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_size += size
+        self._evict_disk()
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def _put_memory(self, key: str, data: bytes, created: float) -> None:
+        if len(data) > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old[0])
+        self._memory[key] = (data, created)
+        self._memory_size += len(data)
+        while self._memory and (len(self._memory) > self.memory_items
+                                or self._memory_size > self.memory_bytes):
+            _, (evicted, _) = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+            self.evictions_memory += 1
+
+    def _remove_disk(self, key: str) -> None:
+        self._disk_size -= self._disk.pop(key)
+        try:
+            os.remove(self._disk_path(key))
+        except OSError:
+            pass
+
+    def _evict_disk(self) -> None:
+        while self._disk and self._disk_size > self.disk_bytes:
+            key, size = self._disk.popitem(last=False)
+            self._disk_size -= size
+            self.evictions_disk += 1
+            try:
+                os.remove(self._disk_path(key))
+            except OSError:
+                pass
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Получить изображение по ключу или None"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                data, created = entry
+                if not self._expired(created):
+                    self._memory.move_to_end(key)
+                    self.hits_memory += 1
+                    return data
+                del self._memory[key]
+                self._memory_size -= len(data)
+                self.expired += 1
+
+            if self.disk_dir and key in self._disk:
+                path = self._disk_path(key)
+                try:
+                    # mtime - время сохранения (для ttl), atime - последнее обращение (для LRU)
+                    created = os.stat(path).st_mtime
+                    if self._expired(created):
+                        self._remove_disk(key)
+                        self.expired += 1
+                        self.misses += 1
+                        return None
+                    with open(path, 'rb') as f:
+                        data = f.read()
+                    os.utime(path, (time.time(), created))
+                except OSError:
+                    self._disk_size -= self._disk.pop(key)
+                else:
+                    self._disk.move_to_end(key)
+                    self._put_memory(key, data, created)
+                    self.hits_disk += 1
+                    return data
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, data: bytes) -> None:
+        """Сохранить закодированное изображение в оба уровня"""
+        with self._lock:
+            self._put_memory(key, data, time.time())
+
+            if not self.disk_dir or key in self._disk or len(data) > self.disk_bytes:
+                return
+            path = self._disk_path(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except OSError:
+                return
+            self._disk[key] = len(data)
+            self._disk_size += len(data)
+            self._evict_disk()
+
+    def delete(self, key: str) -> None:
+        """Удалить запись из обоих уровней"""
+        with self._lock:
+            entry = self._memory.pop(key, None)
+            if entry is not None:
+                self._memory_size -= len(entry[0])
+            if self.disk_dir and key in self._disk:
+                self._remove_disk(key)
+
+    def stats(self) -> dict:
+        """Счетчики попаданий/промахов и заполненность уровней"""
+        with self._lock:
+            return {
+                "hits_memory": self.hits_memory,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "evictions_memory": self.evictions_memory,
+                "evictions_disk": self.evictions_disk,
+                "expired": self.expired,
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "disk_items": len(self._disk),
+                "disk_bytes": self._disk_size,
+            }
@@ -0,0 +1,132 @@
+"""Повторы с экспоненциальной задержкой и circuit breaker для внешних API"""
+
+import asyncio
+import logging
+import random
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker по числу последовательных отказов
+
+    closed    - запросы проходят; после failure_threshold отказов подряд -> open
+    open      - запросы отклоняются сразу; через recovery_timeout секунд -> half_open
+    half_open - пропускается один пробный запрос: успех -> closed, отказ -> open
+
+    Пробный запрос, который не завершился ни успехом, ни отказом (отменен),
+    освобождается через release_probe(); зависший дольше recovery_timeout
+    больше не блокирует следующую пробу.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 3, recovery_timeout: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+
+        self._state = self.CLOSED
+        self._opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self.consecutive_failures = 0
+        self.total_failures = 0
+        self.total_successes = 0
+        self.rejected = 0
+        self.trips = 0
+
+    def _set_state(self, state: str) -> None:
+        if state != self._state:
+            logger.warning("Circuit breaker %s: %s -> %s", self.name, self._state, state)
+            self._state = state
+
+    @property
+    def state(self) -> str:
+        """Текущее состояние (open переходит в half_open по таймауту)"""
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._set_state(self.HALF_OPEN)
+        return self._state
+
+    def is_open(self) -> bool:
+        """Запросы сейчас отклоняются (без учета пробного запроса)"""
+        return self.state == self.OPEN
+
+    def allow_request(self) -> bool:
+        """Можно ли выполнить запрос; в half_open пропускается один пробный"""
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN:
+            now = time.monotonic()
+            if not self._probe_in_flight or now - self._probe_started >= self.recovery_timeout:
+                self._probe_in_flight = True
+                self._probe_started = now
+                return True
+        self.rejected += 1
+        return False
+
+    def release_probe(self) -> None:
+        """Запрос прерван без результата (отмена): пробу можно повторить"""
+        self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        self.total_successes += 1
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+        self._set_state(self.CLOSED)
+
+    def record_failure(self) -> None:
+        self.total_failures += 1
+        self.consecutive_failures += 1
+        probe_failed = self._probe_in_flight
+        self._probe_in_flight = False
+        if probe_failed or self.consecutive_failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                self.trips += 1
+            self._opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+    def snapshot(self) -> dict:
+        """Состояние для мониторинга"""
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "total_failures": self.total_failures,
+            "total_successes": self.total_successes,
+            "rejected": self.rejected,
+            "trips": self.trips,
+            "open_for": (time.monotonic() - self._opened_at) if self._state != self.CLOSED else 0.0,
+        }
+
+
+async def retry_async(func: Callable[[], Awaitable[T]], attempts: int = 3,
+                      base_delay: float = 1.0, max_delay: float = 10.0,
+                      retry_if: Callable[[BaseException], bool] = lambda e: True) -> T:
+    """
+    Выполнить func с повторами при временных ошибках
+
+    Задержка между попытками растет экспоненциально (base_delay * 2^n,
+    не больше max_delay) со случайным разбросом 50-100%, чтобы повторы
+    разных запросов не совпадали по времени.
+    """
+    attempts = max(1, attempts)
+    for attempt in range(1, attempts + 1):
+        try:
+            return await func()
+        except Exception as e:
+            if attempt >= attempts or not retry_if(e):
+                raise
+            delay = min(max_delay, base_delay * 2 ** (attempt - 1))
+            delay *= 0.5 + random.random() / 2
+            logger.info("Попытка %d/%d не удалась (%s), повтор через %.1f с",
+                        attempt, attempts, e, delay)
+            await asyncio.sleep(delay)
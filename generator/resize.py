@@ -0,0 +1,111 @@
+"""Быстрое масштабирование под холст: crop to fit без лишнего ресемплинга
+
+Порядок операций:
+  1. Если источник намного больше холста, он декодируется сразу в
+     уменьшенном разрешении (IMREAD_REDUCED_COLOR_2/4/8 - для JPEG
+     уменьшение выполняется внутри декодера).
+  2. Из источника вырезается область (ROI), которая после масштабирования
+     покроет холст, - это view без копирования.
+  3. Ресемплится только ROI: INTER_AREA при уменьшении, INTER_LANCZOS4
+     при увеличении.
+"""
+
+from io import BytesIO
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Коэффициент уменьшения при декодировании -> флаг OpenCV (от большего к меньшему)
+REDUCED_READ_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# EXIF-ориентации, при которых OpenCV поворачивает изображение на 90 градусов
+EXIF_ORIENTATION = 0x0112
+ROTATED_ORIENTATIONS = {5, 6, 7, 8}
+
+# Сколько байт начала файла читать для размеров (заголовок JPEG с EXIF)
+HEADER_BYTES = 256 * 1024
+
+
+def cover_roi(src_width: int, src_height: int,
+              width: int, height: int) -> Tuple[int, int, int, int]:
+    """
+    Область источника, которая после масштабирования ровно покрывает холст
+
+    Returns:
+        (x, y, w, h) - центрированный прямоугольник с пропорциями холста
+    """
+    scale = max(width / src_width, height / src_height)
+    roi_width = min(src_width, max(1, round(width / scale)))
+    roi_height = min(src_height, max(1, round(height / scale)))
+    x = (src_width - roi_width) // 2
+    y = (src_height - roi_height) // 2
+    return x, y, roi_width, roi_height
+
+
+def resize_cover(image: np.ndarray, width: int, height: int) -> np.ndarray:
+    """
+    Crop to fit: вырезать центральную область и отмасштабировать в width x height
+
+    Исходный массив не меняется; результат - новый буфер.
+    """
+    src_height, src_width = image.shape[:2]
+    x, y, roi_width, roi_height = cover_roi(src_width, src_height, width, height)
+    roi = image[y:y + roi_height, x:x + roi_width]
+    if roi_width == width and roi_height == height:
+        return roi.copy()
+
+    # Уменьшение - усреднение по площади (без алиасинга и быстрее Lanczos)
+    downscale = roi_width > width or roi_height > height
+    interpolation = cv2.INTER_AREA if downscale else cv2.INTER_LANCZOS4
+    return cv2.resize(roi, (width, height), interpolation=interpolation)
+
+
+def reduction_factor(src_width: int, src_height: int, width: int, height: int) -> int:
+    """Наибольший коэффициент уменьшения (1, 2, 4, 8), при котором источник еще покрывает холст"""
+    for factor, _ in REDUCED_READ_FLAGS:
+        if src_width // factor >= width and src_height // factor >= height:
+            return factor
+    return 1
+
+
+def _read_flag(size: Optional[Tuple[int, int]], rotated: bool, width: int, height: int) -> int:
+    if size is None:
+        return cv2.IMREAD_COLOR
+    src_width, src_height = size
+    if rotated:
+        # OpenCV применяет EXIF-поворот: итоговые стороны меняются местами
+        src_width, src_height = src_height, src_width
+    factor = reduction_factor(src_width, src_height, width, height)
+    return dict(REDUCED_READ_FLAGS).get(factor, cv2.IMREAD_COLOR)
+
+
+def _probe(source) -> Tuple[Optional[Tuple[int, int]], bool]:
+    """Размеры и признак поворота по заголовку (без декодирования пикселей)"""
+    try:
+        with Image.open(source) as img:
+            orientation = img.getexif().get(EXIF_ORIENTATION, 1)
+            return img.size, orientation in ROTATED_ORIENTATIONS
+    except Exception:
+        return None, False
+
+
+def read_cover(path: str, width: int, height: int) -> Optional[np.ndarray]:
+    """Прочитать файл (в уменьшенном разрешении, если он намного больше холста)"""
+    size, rotated = _probe(path)
+    return cv2.imread(path, _read_flag(size, rotated, width, height))
+
+
+def decode_cover(data, width: int, height: int) -> Optional[np.ndarray]:
+    """То же для закодированных байт в памяти (bytes/memoryview, без копирования)"""
+    view = memoryview(data)
+    size, rotated = _probe(BytesIO(view[:HEADER_BYTES]))
+    if size is None and len(view) > HEADER_BYTES:
+        size, rotated = _probe(BytesIO(view))
+    buffer = np.frombuffer(view, dtype=np.uint8)
+    return cv2.imdecode(buffer, _read_flag(size, rotated, width, height))
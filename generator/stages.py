@@ -0,0 +1,74 @@
+"""Замер длительности стадий рендера (загрузка шрифта, раскладка, отрисовка, кодирование)
+
+Генератор не зависит от системы метрик: стадии отмечаются через
+stage(name), а куда уходят замеры, решает вызывающий код.
+
+- collect() - собрать длительности стадий текущего вызова в словарь
+  {стадия: секунды}. Используется вокруг задачи в воркере пула (в том
+  числе в отдельном процессе), словарь возвращается вместе с результатом.
+- set_observer(fn) - вне collect() каждая стадия передается в
+  fn(name, seconds) (метрики бота для стадий в основном процессе).
+
+Состояние хранится в contextvars: параллельные задачи в потоках и
+asyncio-задачах не смешивают замеры.
+"""
+
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+FONT_LOAD = "font_load"
+LAYOUT = "layout"
+DRAW = "draw"
+BACKGROUND = "background"
+ENCODE = "encode"
+AI_HTTP = "ai_http"
+AI_DECODE = "ai_decode"
+
+_collector: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar(
+    "stage_collector", default=None)
+_observer: Optional[Callable[[str, float], None]] = None
+
+
+def set_observer(observer: Optional[Callable[[str, float], None]]) -> None:
+    """Получатель замеров вне collect() (None - замеры отбрасываются)"""
+    global _observer
+    _observer = observer
+
+
+def record(name: str, seconds: float) -> None:
+    """Записать длительность стадии"""
+    collector = _collector.get()
+    if collector is not None:
+        collector[name] = collector.get(name, 0.0) + seconds
+    elif _observer is not None:
+        _observer(name, seconds)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Замерить блок как стадию name (повторные вызовы суммируются)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start)
+
+
+@contextmanager
+def collect() -> Iterator[dict]:
+    """Собрать стадии внутри блока в словарь {стадия: секунды}"""
+    stages: dict = {}
+    token = _collector.set(stages)
+    try:
+        yield stages
+    finally:
+        _collector.reset(token)
+
+
+def call_with_stages(func: Callable[..., Any], *args: Any, **kwargs: Any) -> tuple:
+    """Выполнить func и вернуть (результат, стадии); функция уровня модуля - для пула процессов"""
+    with collect() as stages:
+        result = func(*args, **kwargs)
+    return result, stages
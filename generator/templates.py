@@ -1,6 +1,12 @@
 """Шаблоны для генерации изображений"""
 
-from typing import Tuple
+from typing import List, Tuple
+
+from .gradients import ColorStop, DIAGONAL, RADIAL, VERTICAL
+
+# Версия шаблонов - увеличивать при любом изменении внешнего вида превью
+# (входит в ключ кэша готовых изображений)
+TEMPLATE_VERSION = "3"
 
 
 class ColorScheme:
@@ -36,22 +42,56 @@ class ColorScheme:
         "end": (244, 92, 67),      # Оранжево-красный
     }
 
+    # Схемы ниже используют необязательные ключи:
+    #   "kind"  - тип градиента (по умолчанию вертикальный)
+    #   "stops" - промежуточные опорные точки [(позиция 0..1, цвет), ...]
 
-def get_gradient_colors(gradient_type: str) -> Tuple[Tuple[int, int, int], Tuple[int, int, int]]:
-    """Получить цвета градиента по типу"""
-    gradients = {
-        "sunset": ColorScheme.SUNSET,
-        "ocean": ColorScheme.OCEAN,
-        "pink": ColorScheme.PINK,
-        "forest": ColorScheme.FOREST,
-        "night": ColorScheme.NIGHT,
-        "fire": ColorScheme.FIRE,
+    AURORA = {
+        "start": (0, 201, 167),    # Бирюзовый
+        "end": (255, 110, 196),    # Розовый
+        "stops": [(0.5, (120, 115, 245))],  # Фиолетовый
+        "kind": DIAGONAL,
+    }
+
+    GLOW = {
+        "start": (142, 84, 233),   # Светло-фиолетовый (центр)
+        "end": (20, 18, 45),       # Почти черный (края)
+        "kind": RADIAL,
+    }
+
+    DUSK = {
+        "start": (44, 62, 80),     # Темно-синий
+        "end": (253, 116, 108),    # Коралловый
+        "stops": [(0.55, (155, 89, 182))],  # Лиловый
     }
 
-    colors = gradients.get(gradient_type, ColorScheme.OCEAN)
+
+GRADIENTS = {
+    "sunset": ColorScheme.SUNSET,
+    "ocean": ColorScheme.OCEAN,
+    "pink": ColorScheme.PINK,
+    "forest": ColorScheme.FOREST,
+    "night": ColorScheme.NIGHT,
+    "fire": ColorScheme.FIRE,
+    "aurora": ColorScheme.AURORA,
+    "glow": ColorScheme.GLOW,
+    "dusk": ColorScheme.DUSK,
+}
+
+
+def get_gradient_colors(gradient_type: str) -> Tuple[Tuple[int, int, int], Tuple[int, int, int]]:
+    """Получить цвета градиента по типу"""
+    colors = GRADIENTS.get(gradient_type, ColorScheme.OCEAN)
     return colors["start"], colors["end"]
 
 
+def get_gradient_spec(gradient_type: str) -> Tuple[str, List[ColorStop]]:
+    """Получить тип градиента и полный список опорных точек (RGB)"""
+    colors = GRADIENTS.get(gradient_type, ColorScheme.OCEAN)
+    stops = [(0.0, colors["start"])] + list(colors.get("stops", [])) + [(1.0, colors["end"])]
+    return colors.get("kind", VERTICAL), stops
+
+
 class TemplateConfig:
     """Конфигурация шаблонов"""
 
@@ -68,6 +108,12 @@ class TemplateConfig:
     TITLE_FONT_SIZE = 72
     DESCRIPTION_FONT_SIZE = 36
 
+    # Все используемые шрифты (размер, жирный) - для прогрева при старте
+    FONTS = (
+        (TITLE_FONT_SIZE, True),
+        (DESCRIPTION_FONT_SIZE, False),
+    )
+
     # Цвета для минимализма
     MINIMAL_BG_LIGHT = (255, 255, 255)  # Белый
     MINIMAL_BG_DARK = (30, 30, 30)      # Темно-серый
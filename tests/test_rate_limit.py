@@ -0,0 +1,73 @@
+"""Token bucket и RateLimiter: списание, отказ, пополнение, бюджеты"""
+
+from bot.rate_limit import AI, CHEAP, RateLimiter, budget_for, format_retry_after
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_user_bucket_rejects_and_refills():
+    clock = FakeClock()
+    limiter = RateLimiter({AI: (2, 60)}, {}, clock=clock)
+    assert limiter.acquire(AI, 1) == 0
+    assert limiter.acquire(AI, 1) == 0
+    # Токен пополняется раз в 30 с
+    assert limiter.acquire(AI, 1) == 30
+    assert limiter.stats()["ai_user"] == 1
+
+    clock.now += 15
+    assert limiter.peek(AI, 1) == 15
+    clock.now += 15
+    assert limiter.peek(AI, 1) == 0
+    assert limiter.acquire(AI, 1) == 0
+
+
+def test_users_and_budgets_are_independent():
+    limiter = RateLimiter({AI: (1, 60), CHEAP: (1, 60)}, {}, clock=FakeClock())
+    assert limiter.acquire(AI, 1) == 0
+    assert limiter.acquire(AI, 1) > 0
+    assert limiter.acquire(AI, 2) == 0
+    assert limiter.acquire(CHEAP, 1) == 0
+
+
+def test_global_bucket_limits_all_users():
+    limiter = RateLimiter({AI: (5, 60)}, {AI: (2, 60)}, clock=FakeClock())
+    assert limiter.acquire(AI, 1) == 0
+    assert limiter.acquire(AI, 2) == 0
+    assert limiter.acquire(AI, 3) == 30
+    assert limiter.stats()["ai_global"] == 1
+
+
+def test_rejected_request_takes_no_token():
+    clock = FakeClock()
+    limiter = RateLimiter({AI: (1, 60)}, {AI: (1, 60)}, clock=clock)
+    assert limiter.acquire(AI, 1) == 0
+    # Пользователь 2 упирается в общий бакет - его собственный токен не списывается
+    assert limiter.acquire(AI, 2) > 0
+    clock.now += 60
+    assert limiter.acquire(AI, 2) == 0
+
+
+def test_peek_does_not_take_token():
+    limiter = RateLimiter({AI: (1, 60)}, {}, clock=FakeClock())
+    assert limiter.peek(AI, 1) == 0
+    assert limiter.peek(AI, 1) == 0
+    assert limiter.acquire(AI, 1) == 0
+
+
+def test_unlimited_budget():
+    limiter = RateLimiter({AI: None}, {}, clock=FakeClock())
+    assert all(limiter.acquire(AI, 1) == 0 for _ in range(100))
+
+
+def test_budget_for_and_retry_text():
+    assert budget_for('ai') == AI
+    assert budget_for('minimal') == CHEAP
+    assert format_retry_after(0.2) == "1 с"
+    assert format_retry_after(300) == "5 мин"
+    assert format_retry_after(61) == "1 мин 1 с"
@@ -0,0 +1,71 @@
+"""Circuit breaker: пробный запрос освобождается при отмене и по таймауту"""
+
+import asyncio
+import time
+
+from generator.ai_generator import AIImageGenerator
+from generator.resilience import CircuitBreaker
+
+RESET = 0.05
+
+
+def _half_open(breaker: CircuitBreaker) -> None:
+    breaker.record_failure()
+    assert breaker.is_open()
+    time.sleep(RESET * 1.2)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_half_open_allows_single_probe():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=RESET)
+    _half_open(breaker)
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_failed_probe_opens_again():
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=RESET)
+    for _ in range(3):
+        breaker.record_failure()
+    time.sleep(RESET * 1.2)
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.is_open()
+
+
+def test_stale_probe_expires():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=RESET)
+    _half_open(breaker)
+    assert breaker.allow_request()
+    # Проба не завершилась (зависла) - через recovery_timeout пропускается следующая
+    time.sleep(RESET * 1.2)
+    assert breaker.allow_request()
+
+
+def test_cancelled_probe_is_released():
+    generator = AIImageGenerator(api_key="x", retry_attempts=1,
+                                 breaker_threshold=1, breaker_reset=RESET)
+
+    async def hanging_request(prompt):
+        await asyncio.sleep(10)
+
+    generator._request = hanging_request
+
+    async def scenario():
+        _half_open(generator.breaker)
+        task = asyncio.create_task(generator.generate_illustration("prompt"))
+        await asyncio.sleep(0.01)
+        assert not generator.breaker.allow_request()
+
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        # Отмена - не отказ: breaker не размыкается, следующая проба проходит сразу
+        assert generator.breaker.state == CircuitBreaker.HALF_OPEN
+        assert generator.breaker.allow_request()
+
+    asyncio.run(scenario())
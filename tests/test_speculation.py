@@ -0,0 +1,89 @@
+"""Упреждающий AI-запрос: списание токена AI-бюджета и бронь в очереди"""
+
+import asyncio
+
+from bot.ai_queue import AIJobQueue
+from bot.rate_limit import AI, RateLimiter
+from bot.speculation import AUTO, SpeculativeAI
+
+USER_ID = 1
+
+
+class SlowGenerator:
+    """Генератор, запрос которого идет дольше теста"""
+
+    def create_prompt_from_title(self, title, description=None):
+        return title
+
+    async def generate_illustration(self, prompt):
+        await asyncio.sleep(10)
+
+
+async def _runner(job):
+    pass
+
+
+def _speculative(tokens=1):
+    limiter = RateLimiter({AI: (tokens, 3600)}, {})
+    queue = AIJobQueue(_runner, max_pending=2, max_per_user=1)
+    speculative = SpeculativeAI(SlowGenerator(), queue, limiter, policy=AUTO, reuse_after=10)
+    return speculative, limiter, queue
+
+
+def test_restart_is_paid_by_speculation_token():
+    async def scenario():
+        speculative, limiter, queue = _speculative(tokens=1)
+        assert speculative.start(USER_ID, "Заголовок")
+        # Последний токен ушел на упреждающий запрос
+        assert limiter.peek(AI, USER_ID) > 0
+
+        # Описание пришло быстро: auto перезапускает генерацию с описанием
+        task, prepaid = speculative.take(USER_ID, "Заголовок", "Описание")
+        assert task is None and prepaid
+        await asyncio.sleep(0)
+        assert queue.reserved == 0
+
+    asyncio.run(scenario())
+
+
+def test_hit_reuses_task_without_second_token():
+    async def scenario():
+        speculative, limiter, queue = _speculative(tokens=2)
+        assert speculative.start(USER_ID, "Заголовок")
+        task, prepaid = speculative.take(USER_ID, "Заголовок", None)
+        assert task is not None and prepaid
+        assert limiter.peek(AI, USER_ID) == 0  # второй токен не тронут
+        task.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_other_title_is_not_prepaid():
+    async def scenario():
+        speculative, _, _ = _speculative(tokens=2)
+        assert speculative.start(USER_ID, "Старый заголовок")
+        assert speculative.take(USER_ID, "Новый заголовок", None) == (None, False)
+
+    asyncio.run(scenario())
+
+
+def test_start_is_refused_without_token_or_queue_slot():
+    async def scenario():
+        speculative, limiter, queue = _speculative(tokens=2)
+        # Повторы /new -> заголовок: каждый запуск стоит токен
+        assert speculative.start(USER_ID, "Первый")
+        assert speculative.start(USER_ID, "Второй")
+        assert not speculative.start(USER_ID, "Третий")
+        await asyncio.sleep(0)
+
+        # Бронь в общем лимите очереди: пользователей больше, чем мест
+        assert speculative.start(2, "Заголовок")
+        assert speculative.start(3, "Заголовок")
+        assert not speculative.start(4, "Заголовок")
+        assert queue.reserved == 2
+        for user_id in (2, 3):
+            speculative.discard(user_id)
+        await asyncio.sleep(0)
+        assert queue.reserved == 0
+
+    asyncio.run(scenario())